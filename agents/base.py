@@ -1,13 +1,173 @@
+import os
+import time
+import threading
+
 import streamlit as st
-from langchain_groq import ChatGroq
+
+import metrics
+import llm_cache
+from .gateway import LLMGateway
+
+_llm_override = None
+_rate_limiter = None
+
+
+class PromptTemplate:
+    """
+    str.format prompt with the same constructor and format() as LangChain's
+    PromptTemplate, minus the ~0.5s import of langchain_core.prompts at startup.
+    """
+
+    def __init__(self, input_variables, template):
+        self.input_variables = list(input_variables)
+        self.template = template
+
+    def format(self, **kwargs):
+        return self.template.format(**kwargs)
+
+
+def set_llm(llm):
+    """Routes every agent call to `llm` (e.g. an offline fake); None restores Groq."""
+    global _llm_override
+    _llm_override = llm
+
+
+class RateLimiter:
+    """Spaces out calls so that at most `calls_per_minute` start in any minute."""
+
+    def __init__(self, calls_per_minute):
+        self.interval = 60.0 / calls_per_minute
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+        return slot - now
+
+
+def set_rate_limit(calls_per_minute):
+    """Caps LLM requests across all threads; None or 0 removes the cap."""
+    global _rate_limiter
+    _rate_limiter = RateLimiter(calls_per_minute) if calls_per_minute else None
+
+
+def _wait_for_slot(agent):
+    limiter = _rate_limiter
+    if limiter is not None:
+        waited = limiter.acquire()
+        if waited > 0:
+            metrics.record("llm_rate_wait", seconds=waited, agent=agent)
 
 
-@st.cache_resource(show_spinner=False)
 def get_llm():
-    api_key = st.secrets["GROQ_API_KEY"]
+    if _llm_override is not None:
+        return _llm_override
+    return get_gateway()
+
+
+@st.cache_resource(show_spinner=False)
+def get_gateway():
+    """The process-wide Groq gateway (shared connection pool and rate limits)."""
+    # Headless runs (CLI, batch jobs) have no Streamlit secrets file.
+    api_key = os.environ.get("GROQ_API_KEY") or st.secrets["GROQ_API_KEY"]
+    return LLMGateway(api_key)
+
+
+def invoke_llm(prompt, agent, response_format=None):
+    """
+    Single blocking completion; records latency and token usage as '<agent>_llm'.
+    Replies are served from and stored in the persistent LLM cache.
+    `response_format` (e.g. {"type": "json_object"}) constrains the reply.
+    """
+    llm = get_llm()
+    key = llm_cache.llm_key(llm, prompt, response_format)
+    cached = llm_cache.get(key, agent)
+    if cached is not None:
+        return cached[0]
+
+    stage = f"{agent}_llm"
+    _wait_for_slot(agent)
+    with metrics.stage(stage):
+        if response_format is None:
+            response = llm.invoke(prompt)
+        else:
+            response = llm.invoke(prompt, response_format=response_format)
+    metrics.record_llm_usage(stage, response)
+    content = response if isinstance(response, str) else response.content
+    llm_cache.put(key, agent, content, getattr(response, "usage_metadata", None))
+    return content
+
+
+class TimedStream:
+    """
+    Iterable of text chunks from llm.stream(prompt). The request is only sent
+    once iteration starts; afterwards `ttft`, `elapsed` and `text` describe it.
+    Iterating again (e.g. on a Streamlit rerun) replays a finished stream's
+    text and restarts an unfinished one from scratch.
+    """
+
+    def __init__(self, prompt, agent="stream"):
+        self.prompt = prompt
+        self.agent = agent
+        self.ttft = None
+        self.elapsed = None
+        self._parts = []
+        self._finished = False
+
+    def __iter__(self):
+        if self._finished:
+            yield self.text
+            return
+        self.ttft = self.elapsed = None
+        self._parts = []
+
+        llm = get_llm()
+        key = llm_cache.llm_key(llm, self.prompt)
+        cached = llm_cache.get(key, self.agent)
+        if cached is not None:
+            self.ttft = self.elapsed = 0.0
+            self._parts = [cached[0]]
+            self._finished = True
+            yield cached[0]
+            return
+
+        _wait_for_slot(self.agent)
+        started = time.perf_counter()
+        usage = None
+        finished = False
+        try:
+            for chunk in llm.stream(self.prompt):
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                text = chunk if isinstance(chunk, str) else chunk.content
+                if not text:
+                    continue
+                if self.ttft is None:
+                    self.ttft = time.perf_counter() - started
+                self._parts.append(text)
+                yield text
+            finished = True
+        finally:
+            # Also runs when the consumer stops early (e.g. a UI timeout).
+            self.elapsed = time.perf_counter() - started
+            usage = usage or {}
+            metrics.record(
+                f"{self.agent}_llm",
+                seconds=self.elapsed,
+                ttft=self.ttft or 0.0,
+                llm_calls=1,
+                input_tokens=usage.get("input_tokens", 0),
+                output_tokens=usage.get("output_tokens", 0),
+            )
+            self._finished = finished
+            if finished:
+                # Early-stopped streams are partial answers; never cache those.
+                llm_cache.put(key, self.agent, self.text, usage)
 
-    return ChatGroq(
-        model_name="llama-3.3-70b-versatile",  # Free, fast model on Groq
-        temperature=0.2,
-        groq_api_key=api_key,
-    )
+    @property
+    def text(self):
+        return "".join(self._parts)
@@ -0,0 +1,172 @@
+import re
+import threading
+
+# phrase -> weight per topic. Weight 3 phrases are decisive on their own;
+# lower weights only add evidence. Earlier topics win ties.
+TOPIC_RULES = {
+    "CALCULUS": {
+        "dy/dx": 3,
+        "d/dx": 3,
+        "integrate": 3,
+        "integral": 3,
+        "derivative": 3,
+        "differentiate": 3,
+        "differential": 3,
+        "area under curve": 3,
+        "area under the curve": 3,
+        "l'hopital": 3,
+        "taylor series": 3,
+        "maclaurin": 3,
+        "antiderivative": 3,
+        "limit": 2,
+        "rate of change": 2,
+        "maxima": 1,
+        "minima": 1,
+        "tangent line": 1,
+    },
+    "LINEAR_ALGEBRA": {
+        "eigenvalue": 3,
+        "eigenvalues": 3,
+        "eigenvector": 3,
+        "eigenvectors": 3,
+        "determinant": 3,
+        "matrix multiplication": 3,
+        "row echelon": 3,
+        "linear map": 3,
+        "matrix": 2,
+        "matrices": 2,
+        "inverse of the matrix": 3,
+        "rank": 1,
+        "vector": 1,
+        "vectors": 1,
+    },
+    "PROBABILITY": {
+        "probability": 3,
+        "conditional distribution": 3,
+        "random variable": 3,
+        "bayes": 3,
+        "variance": 3,
+        "standard deviation": 3,
+        "expected value": 3,
+        "dice": 2,
+        "die": 1,
+        "coin": 2,
+        "coins": 2,
+        "balls": 2,
+        "marbles": 2,
+        "cards": 1,
+        "at random": 2,
+        "randomly": 2,
+        "chance": 1,
+    },
+    "GEOMETRY": {
+        "triangle": 3,
+        "circle": 3,
+        "radius": 3,
+        "hypotenuse": 3,
+        "volume of": 3,
+        "surface area": 3,
+        "perimeter": 3,
+        "angle": 2,
+        "polygon": 2,
+        "rectangle": 2,
+        "square of side": 2,
+        "diameter": 2,
+        "sphere": 2,
+        "cylinder": 2,
+    },
+    "STATISTICS": {
+        "median": 2,
+        "mean": 1,
+        "mode": 1,
+        "regression": 2,
+        "correlation": 2,
+        "sample": 1,
+        "percentile": 2,
+    },
+    "NUMBER_THEORY": {
+        "prime": 2,
+        "primes": 2,
+        "gcd": 3,
+        "lcm": 3,
+        "greatest common divisor": 3,
+        "least common multiple": 3,
+        "divisible": 2,
+        "modulo": 3,
+        "remainder when": 2,
+        "congruent": 2,
+    },
+    "ALGEBRA": {
+        "quadratic": 2,
+        "polynomial": 2,
+        "equation": 1,
+        "roots": 1,
+        "complex number": 2,
+        "factorize": 2,
+        "factor": 1,
+        "simplify": 1,
+        "inequality": 2,
+        "logarithm": 1,
+    },
+}
+
+CONFIDENCE_THRESHOLD = 0.6
+
+
+class KeywordClassifier:
+    """
+    All topic phrases compiled into one regex alternation with word
+    boundaries, so a problem is scanned once regardless of rule count. A
+    trailing "s" is allowed, so "integrals" counts as "integral".
+    """
+
+    def __init__(self, rules=TOPIC_RULES):
+        self.topics = list(rules)
+        self._weights = {}
+        for topic, phrases in rules.items():
+            for phrase, weight in phrases.items():
+                self._weights.setdefault(phrase.lower(), []).append((topic, weight))
+
+        # Longest first so "area under the curve" wins over shorter overlaps.
+        alternation = "|".join(
+            re.escape(phrase) for phrase in sorted(self._weights, key=len, reverse=True)
+        )
+        self._pattern = re.compile(rf"(?<!\w)(?P<phrase>{alternation})s?(?!\w)")
+
+    def scores(self, text):
+        scores = {}
+        for match in self._pattern.finditer(text.lower()):
+            for topic, weight in self._weights[match.group("phrase")]:
+                scores[topic] = scores.get(topic, 0) + weight
+        return scores
+
+    def classify(self, text):
+        """Returns (topic or None, confidence in [0, 1), per-topic scores)."""
+        scores = self.scores(text)
+        if not scores:
+            return None, 0.0, scores
+
+        # max() keeps the first topic in rule order on ties.
+        topic = max(self.topics, key=lambda t: scores.get(t, 0))
+        confidence = scores[topic] / (sum(scores.values()) + 1)
+        return topic, confidence, scores
+
+
+TOPIC_CLASSIFIER = KeywordClassifier()
+
+_stats_lock = threading.Lock()
+_stats = {"keyword": 0, "llm": 0}
+
+
+def record_route(source):
+    with _stats_lock:
+        _stats[source] = _stats.get(source, 0) + 1
+
+
+def routing_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    total = sum(stats.values())
+    for source in list(stats):
+        stats[f"{source}_rate"] = stats[source] / total if total else 0.0
+    return stats
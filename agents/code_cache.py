@@ -0,0 +1,101 @@
+import io
+import os
+import hashlib
+import tokenize
+
+import metrics
+import llm_cache
+from cache import PersistentLRUCache
+from memory_store import normalize_question
+
+# Set MATH_MENTOR_CODE_CACHE=memory to keep results in-process only.
+CODE_CACHE_PATH = (
+    None
+    if os.environ.get("MATH_MENTOR_CODE_CACHE") == "memory"
+    else "./cache/code_cache.db"
+)
+CODE_CACHE_SIZE = 1024
+
+_executions = PersistentLRUCache(
+    CODE_CACHE_PATH, table="executions", maxsize=CODE_CACHE_SIZE
+)
+_generations = PersistentLRUCache(
+    CODE_CACHE_PATH, table="generations", maxsize=CODE_CACHE_SIZE
+)
+
+
+def set_path(path):
+    """Switches both tables to another file (None = in-memory), e.g. a scratch directory."""
+    global CODE_CACHE_PATH, _executions, _generations
+    CODE_CACHE_PATH = path
+    _executions = PersistentLRUCache(path, table="executions", maxsize=CODE_CACHE_SIZE)
+    _generations = PersistentLRUCache(
+        path, table="generations", maxsize=CODE_CACHE_SIZE
+    )
+
+
+def normalize_code(code_str):
+    """Drops comments, blank lines and trailing whitespace so cosmetic edits share a key."""
+    try:
+        tokens = [
+            token
+            for token in tokenize.generate_tokens(io.StringIO(code_str).readline)
+            if token.type != tokenize.COMMENT
+        ]
+        code_str = tokenize.untokenize(tokens)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        pass
+
+    lines = [line.rstrip() for line in code_str.replace("\r\n", "\n").split("\n")]
+    return "\n".join(line for line in lines if line.strip())
+
+
+def _key(*parts):
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+def cached_execution(code_str, use_sympy, execute):
+    """
+    Returns execute(code_str, use_sympy=...) from cache when the same normalized
+    code ran before. Only successful runs are stored; timeouts and errors retry.
+    """
+    key = _key("sympy" if use_sympy else "python", normalize_code(code_str))
+    result = _executions.get(key)
+    metrics.record_cache("code_execution_cache", result is not None)
+    if result is not None:
+        return result, None
+
+    result, error = execute(code_str, use_sympy=use_sympy)
+    if result is not None and error is None:
+        _executions.set(key, result)
+    return result, error
+
+
+def get_generated_code(prompt_name, problem_text):
+    """Previously generated LLM reply for this prompt and normalized problem, if any."""
+    if llm_cache.bypassed():
+        return None
+    content = _generations.get(_key(prompt_name, normalize_question(problem_text)))
+    metrics.record_cache("code_generation_cache", content is not None)
+    return content
+
+
+def remember_generated_code(prompt_name, problem_text, content):
+    """Called once the reply's code has run successfully, so broken code is never reused."""
+    _generations.set(_key(prompt_name, normalize_question(problem_text)), content)
+
+
+def forget_generated_code(problem_text, prompt_names=("sympy", "basic")):
+    """Drops stored replies for this problem, e.g. after the user marked the answer wrong."""
+    question = normalize_question(problem_text)
+    for prompt_name in prompt_names:
+        _generations.delete(_key(prompt_name, question))
+
+
+def clear():
+    _executions.clear()
+    _generations.clear()
+
+
+def cache_stats():
+    return {"executions": _executions.stats(), "generations": _generations.stats()}
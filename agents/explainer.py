@@ -1,5 +1,5 @@
-from .base import get_llm
-from langchain_core.prompts import PromptTemplate
+from .base import invoke_llm, TimedStream, PromptTemplate
+from metrics import timed
 
 EXPLAINER_PROMPT = PromptTemplate(
     input_variables=["problem_text", "solution"],
@@ -10,7 +10,15 @@ EXPLAINER_PROMPT = PromptTemplate(
     """
 )
 
+@timed("explainer")
 def run_explainer_agent(problem_text, solution):
-    llm = get_llm()
-    response = llm.invoke(EXPLAINER_PROMPT.format(problem_text=problem_text, solution=solution))
-    return response if isinstance(response, str) else response.content
\ No newline at end of file
+    return invoke_llm(
+        EXPLAINER_PROMPT.format(problem_text=problem_text, solution=solution),
+        agent="explainer",
+    )
+
+def stream_explainer_agent(problem_text, solution):
+    return TimedStream(
+        EXPLAINER_PROMPT.format(problem_text=problem_text, solution=solution),
+        agent="explainer",
+    )
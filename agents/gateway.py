@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+
+GROQ_BASE_URL = os.environ.get(
+    "MATH_MENTOR_LLM_BASE_URL", "https://api.groq.com/openai/v1"
+)
+LLM_MODEL = "llama-3.3-70b-versatile"
+LLM_TEMPERATURE = 0.2
+
+# Client-side budget, kept a little under the account's Groq limits.
+REQUESTS_PER_MINUTE = float(os.environ.get("MATH_MENTOR_LLM_RPM", "30"))
+TOKENS_PER_MINUTE = float(os.environ.get("MATH_MENTOR_LLM_TPM", "6000"))
+MAX_RETRIES = int(os.environ.get("MATH_MENTOR_LLM_RETRIES", "5"))
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 20.0
+REQUEST_TIMEOUT_SECONDS = 60.0
+LOOP_START_TIMEOUT_SECONDS = 30.0
+MAX_CONNECTIONS = 20
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(RuntimeError):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class TokenBucket:
+    """
+    Refills `rate_per_minute` units per minute up to `capacity`; acquire()
+    waits until the requested amount is available. Event-loop only.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(
+            self.capacity, self.available + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    async def acquire(self, amount=1.0):
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            while self.available < amount:
+                delay = (amount - self.available) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self.available -= amount
+        return waited
+
+    def penalize(self, seconds):
+        """Empties the bucket for `seconds`, e.g. after the server sent Retry-After."""
+        self._refill()
+        self.available = min(self.available, -seconds * self.rate)
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Exponential backoff with full jitter; a server Retry-After wins when longer."""
+    delay = random.uniform(
+        0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2**attempt)
+    )
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def _retry_after(response):
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _usage(payload):
+    usage = payload.get("usage") or {}
+    return {
+        "input_tokens": usage.get("prompt_tokens", 0),
+        "output_tokens": usage.get("completion_tokens", 0),
+        "total_tokens": usage.get("total_tokens", 0),
+    }
+
+
+class LLMGateway:
+    """
+    Async client for the Groq chat completions API.
+
+    All calls share one httpx connection pool and one event loop (run on a
+    daemon thread so synchronous agents can use invoke()/stream()). Each
+    request waits on a request bucket and a token bucket, 429/5xx responses
+    are retried with jittered backoff, and identical prompts issued while one
+    is in flight share its result.
+    """
+
+    def __init__(
+        self,
+        api_key,
+        base_url=GROQ_BASE_URL,
+        model=LLM_MODEL,
+        temperature=LLM_TEMPERATURE,
+        requests_per_minute=REQUESTS_PER_MINUTE,
+        tokens_per_minute=TOKENS_PER_MINUTE,
+        max_retries=MAX_RETRIES,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.temperature = temperature
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.stats = {"requests": 0, "retries": 0, "coalesced": 0, "throttled": 0.0}
+
+        self._loop = None
+        self._loop_error = None
+        self._loop_ready = threading.Event()
+        self._start_lock = threading.Lock()
+        self._client = None
+        self._inflight = {}
+
+    # --- event loop plumbing ---------------------------------------------
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                self._loop_ready.clear()
+                self._loop_error = None
+                thread = threading.Thread(
+                    target=self._run_loop, name="llm-gateway", daemon=True
+                )
+                thread.start()
+                if not self._loop_ready.wait(LOOP_START_TIMEOUT_SECONDS):
+                    raise LLMError("LLM gateway event loop did not start in time")
+                if self._loop_error is not None:
+                    # Left unset, so the next call tries to start it again.
+                    raise self._loop_error
+        return self._loop
+
+    def _run_loop(self):
+        loop = asyncio.new_event_loop()
+        try:
+            import httpx
+
+            asyncio.set_event_loop(loop)
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=REQUEST_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_CONNECTIONS,
+                ),
+            )
+            self._requests = TokenBucket(self.requests_per_minute)
+            self._tokens = TokenBucket(self.tokens_per_minute)
+        except Exception as e:
+            self._loop_error = e
+            loop.close()
+            return
+        else:
+            # Only published once everything the coroutines use exists.
+            self._loop = loop
+        finally:
+            self._loop_ready.set()
+        loop.run_forever()
+
+    def _submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+
+    def close(self):
+        if self._loop is None:
+            return
+        self._submit(self._client.aclose()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+    # --- async API --------------------------------------------------------
+
+    def _body(self, prompt, stream=False, response_format=None):
+        body = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": stream,
+        }
+        if response_format is not None:
+            body["response_format"] = response_format
+        return body
+
+    async def _throttle(self, prompt):
+        waited = await self._requests.acquire()
+        waited += await self._tokens.acquire(estimate_tokens(prompt))
+        self.stats["throttled"] += waited
+
+    async def _send(self, prompt, stream=False, response_format=None):
+        """POSTs with retries; returns an open httpx.Response for a 200."""
+        import httpx
+
+        for attempt in range(self.max_retries + 1):
+            await self._throttle(prompt)
+            self.stats["requests"] += 1
+            try:
+                request = self._client.build_request(
+                    "POST",
+                    "/chat/completions",
+                    json=self._body(prompt, stream, response_format),
+                )
+                response = await self._client.send(request, stream=True)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise LLMError(f"LLM request failed: {e}") from e
+                self.stats["retries"] += 1
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            if response.status_code == 200:
+                return response
+
+            await response.aread()
+            await response.aclose()
+            if response.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                raise LLMError(
+                    f"LLM request failed ({response.status_code}): {response.text[:200]}",
+                    status=response.status_code,
+                )
+
+            retry_after = _retry_after(response)
+            if response.status_code == 429 and retry_after:
+                self._requests.penalize(retry_after)
+            self.stats["retries"] += 1
+            await asyncio.sleep(backoff_delay(attempt, retry_after))
+
+    async def _complete(self, prompt, response_format=None):
+        from langchain_core.messages import AIMessage
+
+        response = await self._send(prompt, response_format=response_format)
+        try:
+            payload = json.loads(await response.aread())
+        finally:
+            await response.aclose()
+        return AIMessage(
+            content=payload["choices"][0]["message"]["content"] or "",
+            usage_metadata=_usage(payload),
+        )
+
+    async def acomplete(self, prompt, response_format=None):
+        """
+        One completion as an AIMessage; concurrent identical prompts share a
+        call. `response_format` is passed through to the API, e.g.
+        {"type": "json_object"} for JSON mode.
+        """
+        fmt = json.dumps(response_format, sort_keys=True) if response_format else None
+        key = (self.model, self.temperature, prompt, fmt)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._complete(prompt, response_format))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        # shield: one caller being cancelled must not cancel the shared call.
+        return await asyncio.shield(task)
+
+    async def astream(self, prompt):
+        """Yields AIMessageChunks; the last one carries usage when the server sends it."""
+        from langchain_core.messages import AIMessageChunk
+
+        response = await self._send(prompt, stream=True)
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:") :].strip()
+                if data == "[DONE]":
+                    # Drain to the end so the connection goes back to the pool.
+                    continue
+                payload = json.loads(data)
+                usage = payload.get("usage") or (payload.get("x_groq") or {}).get(
+                    "usage"
+                )
+                choices = payload.get("choices") or [{}]
+                text = (choices[0].get("delta") or {}).get("content") or ""
+                if text or usage:
+                    yield AIMessageChunk(
+                        content=text,
+                        usage_metadata=_usage({"usage": usage}) if usage else None,
+                    )
+        finally:
+            await response.aclose()
+
+    # --- synchronous facade used by agents.base ----------------------------
+
+    def invoke(self, prompt, response_format=None):
+        return self._submit(self.acomplete(prompt, response_format)).result()
+
+    def stream(self, prompt):
+        """Bridges astream() onto the calling thread, one chunk at a time."""
+        chunks = self.astream(prompt)
+        try:
+            while True:
+                try:
+                    yield self._submit(chunks.__anext__()).result()
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Consumer stopped early (or finished): release the connection.
+            self._submit(chunks.aclose()).result()
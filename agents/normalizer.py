@@ -0,0 +1,165 @@
+import re
+import unicodedata
+
+from .classifier import TOPIC_CLASSIFIER
+
+SUPERSCRIPTS = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹⁺⁻⁼⁽⁾ⁿˣ", "0123456789+-=()nx")
+SUBSCRIPTS = str.maketrans("₀₁₂₃₄₅₆₇₈₉₊₋₌₍₎ₙₓ", "0123456789+-=()nx")
+
+# Applied after NFKC, which already folds ligatures, full-width forms and
+# vulgar fractions (½ -> 1⁄2) but leaves math operators alone.
+SYMBOLS = {
+    "×": "*",
+    "·": "*",
+    "⋅": "*",
+    "∙": "*",
+    "÷": "/",
+    "⁄": "/",
+    "∕": "/",
+    "−": "-",
+    "‐": "-",
+    "‑": "-",
+    "–": "-",
+    "—": "-",
+    "≤": "<=",
+    "≥": ">=",
+    "≠": "!=",
+    "→": "->",
+    "⟶": "->",
+    "∞": "infinity",
+    "“": '"',
+    "”": '"',
+    "‘": "'",
+    "’": "'",
+    "​": "",
+    "‌": "",
+    "‍": "",
+    "﻿": "",
+}
+_SYMBOLS = str.maketrans(SYMBOLS)
+
+_SUPERSCRIPT_RUN = re.compile("[⁰¹²³⁴⁵⁶⁷⁸⁹⁺⁻⁼⁽⁾ⁿˣ]+")
+_SUBSCRIPT_RUN = re.compile("[₀₁₂₃₄₅₆₇₈₉₊₋₌₍₎ₙₓ]+")
+_SQRT = re.compile(r"√\s*(\d+(?:\.\d+)?|[A-Za-z]\w*)")
+_BULLET = re.compile(r"^\s*[•◦▪●■□➢►]\s*", re.MULTILINE)
+_HYPHENATED = re.compile(r"([a-z])-[ \t]*\n[ \t]*([a-z])")
+# Numbers Tesseract read with letter look-alikes: "1O0" -> "100", "3.l4" -> "3.14".
+# Only letters between two digits are repaired ("5l" may be litres), plus a
+# trailing capital O, which is no unit ("1O" -> "10").
+_NUMERIC_TOKEN = re.compile(
+    r"(?<![\w.])(?=[\dOolI.]*\d)[\dOolI]+(?:\.[\dOolI]+)?(?![\w])"
+)
+_DIGIT_SPAN = re.compile(r"\d(?:.*\d)?")
+_DIGIT_LOOKALIKES = str.maketrans("OolI", "0011")
+# A lone "O" right after an operator is a zero: "x^2 - 4 = O".
+_OPERATOR_ZERO = re.compile(r"([=+\-*/]\s*)O\b")
+_SPACES = re.compile(r"[ \t\f\v\xa0]+")
+
+# Anything else left after normalization is likely an OCR or transcription artifact.
+_EXPECTED = re.compile(
+    r"[A-Za-z0-9\s+\-*/^=<>()\[\]{}.,;:!?'\"%$&|_~#@]|[α-ωΑ-Ω≈°±∫∑∏∂∈∉∪∩′]"
+)
+_WORD = re.compile(r"[A-Za-z]+")
+_GARBLED_WORD = re.compile(r"[A-Za-z]{2,}\d[A-Za-z]{2,}")
+_VOWELS = set("aeiouAEIOU")
+# Abbreviations that legitimately have no vowels.
+_NO_VOWEL_WORDS = {
+    "sqrt",
+    "lcm",
+    "gcd",
+    "hcf",
+    "cdf",
+    "pdf",
+    "pmf",
+    "std",
+    "nth",
+    "mph",
+}
+# Digits, operators or a lone variable letter ("a" and "I" are usually words).
+_MATH_SIGNAL = re.compile(r"\d|[+\-*/^=<>]|\b[b-hj-zB-HJ-Z]\b")
+
+GARBLED_CHAR_RATIO = 0.05
+GARBLED_WORD_RATIO = 0.15
+_BRACKETS = {")": "(", "]": "[", "}": "{"}
+
+
+def _superscript(match):
+    power = match.group(0).translate(SUPERSCRIPTS)
+    return f"^{power}" if len(power) == 1 else f"^({power})"
+
+
+def _repair_number(match):
+    token = match.group(0)
+    start, end = _DIGIT_SPAN.search(token).span()
+    core = token[start:end].translate(_DIGIT_LOOKALIKES)
+    return token[:start] + core + token[end:].replace("O", "0")
+
+
+def normalize(raw_text):
+    """
+    Cleans OCR/ASR/typed input without an LLM: Unicode math symbols become
+    ASCII operators, exponents and indices become ^ and _, digits misread as
+    letters are repaired, bullets and line-break hyphens are removed and
+    whitespace is collapsed (line breaks are kept).
+    """
+    text = _SUPERSCRIPT_RUN.sub(_superscript, raw_text)
+    text = _SUBSCRIPT_RUN.sub(lambda m: "_" + m.group(0).translate(SUBSCRIPTS), text)
+    text = unicodedata.normalize("NFKC", text).translate(_SYMBOLS)
+    text = _SQRT.sub(r"sqrt(\1)", text).replace("√", "sqrt")
+    text = _BULLET.sub("", text)
+    text = _HYPHENATED.sub(r"\1\2", text)
+    text = _NUMERIC_TOKEN.sub(_repair_number, text)
+    text = _OPERATOR_ZERO.sub(r"\g<1>0", text)
+    lines = (_SPACES.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def guess_topic(text):
+    """Display name of the best keyword topic ("Linear Algebra"), or "General"."""
+    topic, _, _ = TOPIC_CLASSIFIER.classify(text)
+    return topic.replace("_", " ").title() if topic else "General"
+
+
+def _balanced(text):
+    stack = []
+    for char in text:
+        if char in "([{":
+            stack.append(char)
+        elif char in _BRACKETS:
+            if not stack or stack.pop() != _BRACKETS[char]:
+                return False
+    return not stack
+
+
+def llm_reasons(text):
+    """
+    Why normalized `text` still needs the LLM to clean it up; an empty list
+    means the local result is good enough to use as is.
+    """
+    if not text:
+        return []
+    reasons = []
+    unexpected = sum(1 for char in text if not _EXPECTED.match(char))
+    if unexpected / len(text) > GARBLED_CHAR_RATIO:
+        reasons.append("garbled_characters")
+    if not _balanced(text):
+        reasons.append("unbalanced_brackets")
+
+    words = _WORD.findall(text)
+    suspicious = sum(
+        1
+        for word in words
+        if len(word) >= 4
+        and not _VOWELS.intersection(word)
+        and word.lower() not in _NO_VOWEL_WORDS
+    ) + len(_GARBLED_WORD.findall(text))
+    if words and suspicious / len(words) > GARBLED_WORD_RATIO:
+        reasons.append("garbled_words")
+    return reasons
+
+
+def needs_clarification(text):
+    """Nothing to solve: empty, or no numbers, operators, variables or topic words."""
+    return not text or (
+        not _MATH_SIGNAL.search(text) and not TOPIC_CLASSIFIER.scores(text)
+    )
@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+from .verifier import run_verifier_agent
+from .explainer import run_explainer_agent
+
+# Seconds each post-solve agent may take before we stop waiting for it.
+POST_SOLVE_TIMEOUTS = {"verifier": 45, "explainer": 60}
+
+POST_SOLVE_AGENTS = {
+    "verifier": run_verifier_agent,
+    "explainer": run_explainer_agent,
+}
+
+# Shared across sessions so concurrent users cannot spawn unbounded threads.
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="post-solve")
+
+
+def run_post_solve_agents(problem_text, solution, agents=None, timeouts=None):
+    """
+    Runs the verifier and explainer side by side, since both only need the
+    problem and the solution. Yields (agent, result, error, elapsed_seconds)
+    in completion order; an agent that exceeds its timeout yields an error
+    and is abandoned (its thread finishes in the background).
+    """
+    agents = agents or list(POST_SOLVE_AGENTS)
+    timeouts = {**POST_SOLVE_TIMEOUTS, **(timeouts or {})}
+
+    started = time.perf_counter()
+    pending = {}
+    for name in agents:
+        future = _executor.submit(
+            metrics.bind(POST_SOLVE_AGENTS[name]), problem_text, solution
+        )
+        pending[future] = (name, started + timeouts[name])
+
+    while pending:
+        now = time.perf_counter()
+        next_deadline = min(deadline for _, deadline in pending.values())
+        done, _ = wait(
+            pending, timeout=max(0, next_deadline - now), return_when=FIRST_COMPLETED
+        )
+
+        for future in done:
+            name, _ = pending.pop(future)
+            elapsed = time.perf_counter() - started
+            try:
+                yield name, future.result(), None, elapsed
+            except Exception as e:
+                yield name, None, str(e), elapsed
+
+        now = time.perf_counter()
+        for future, (name, deadline) in list(pending.items()):
+            if deadline <= now and not future.done():
+                pending.pop(future)
+                future.cancel()
+                yield name, None, f"Timed out after {timeouts[name]}s", now - started
+
+
+def submit_post_solve_agent(name, problem_text, solution):
+    """Starts one agent on the shared pool and returns its future."""
+    return _executor.submit(
+        metrics.bind(POST_SOLVE_AGENTS[name]), problem_text, solution
+    )
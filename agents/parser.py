@@ -1,53 +1,139 @@
 import json
-import re
-from langchain_core.prompts import PromptTemplate
-from .base import get_llm
+import threading
+from .base import invoke_llm, PromptTemplate
+from .normalizer import normalize, guess_topic, llm_reasons, needs_clarification
+import metrics
+from metrics import timed
+
+# JSON mode on Groq guarantees a syntactically valid object; the fields are
+# then checked against PARSER_SCHEMA here. Models that support strict
+# structured output can use {"type": "json_schema", ...} instead.
+PARSER_RESPONSE_FORMAT = {"type": "json_object"}
+PARSER_SCHEMA = {
+    "problem_text": str,
+    "topic": str,
+    "needs_clarification": bool,
+}
 
 PARSER_PROMPT = PromptTemplate(
     input_variables=["input_text"],
     template="""
-    You are a Math Parser. 
+    You are a Math Parser.
     1. Fix any typos in the text below.
     2. Format it as a clean math problem.
     3. Output STRICT JSON.
-    
+
     Input: "{input_text}"
-    
+
     JSON Schema:
     {{
         "problem_text": "The full cleaned text of the problem",
         "topic": "Guess the topic (Algebra, Probability, Calculus, etc)",
         "needs_clarification": false
     }}
-    
+
     Do NOT add markdown. Output ONLY the JSON object.
     """,
 )
 
+PARSER_RETRY_PROMPT = PromptTemplate(
+    input_variables=["prompt", "reply", "error"],
+    template="""{prompt}
+    Your previous reply was rejected: {error}
+    Previous reply: {reply}
+    Reply again with ONLY a JSON object that has exactly these keys:
+    "problem_text" (string), "topic" (string), "needs_clarification" (boolean).
+    """,
+)
 
-def run_parser_agent(raw_text):
-    text = raw_text.strip()
-    if len(text) > 100 or "balls" in text or "probability" in text:
-        return {
-            "problem_text": text,
-            "topic": "Probability/General",
-            "needs_clarification": False,
-        }
-    llm = get_llm()
+_stats_lock = threading.Lock()
+_stats = {"local": 0, "llm": 0, "llm_retry": 0, "fallback": 0}
+
+
+def record_parse(source):
+    with _stats_lock:
+        _stats[source] = _stats.get(source, 0) + 1
+
+
+def parser_stats():
+    """How parses were resolved in this process; `local_rate` skipped the LLM."""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = sum(stats.values())
+    for source in list(stats):
+        stats[f"{source}_rate"] = stats[source] / total if total else 0.0
+    return stats
+
+
+def validate_parsed(content):
+    """
+    Parses an LLM reply and checks it against PARSER_SCHEMA. Returns the
+    dict, or raises ValueError describing what is wrong (fed to the retry).
+    """
+    start, end = content.find("{"), content.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError("no JSON object found")
     try:
-        response = llm.invoke(PARSER_PROMPT.format(input_text=text))
+        parsed = json.loads(content[start : end + 1])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON ({e})") from None
+    if not isinstance(parsed, dict):
+        raise ValueError("expected a JSON object")
 
-        content = response if isinstance(response, str) else response.content
+    if isinstance(parsed.get("needs_clarification"), str):
+        parsed["needs_clarification"] = parsed["needs_clarification"].lower() == "true"
+    problems = [
+        f'"{field}" must be a {kind.__name__}'
+        for field, kind in PARSER_SCHEMA.items()
+        if not isinstance(parsed.get(field), kind)
+    ]
+    if not problems and not parsed["problem_text"].strip():
+        problems.append('"problem_text" is empty')
+    if problems:
+        raise ValueError("; ".join(problems))
+    return {field: parsed[field] for field in PARSER_SCHEMA}
 
-        clean_json = content.replace("```json", "").replace("```", "").strip()
 
-        parsed = json.loads(clean_json)
+def _parse_with_llm(text):
+    prompt = PARSER_PROMPT.format(input_text=text)
+    content = invoke_llm(prompt, agent="parser", response_format=PARSER_RESPONSE_FORMAT)
+    try:
+        return validate_parsed(content), "llm"
+    except ValueError as e:
+        retry = PARSER_RETRY_PROMPT.format(prompt=prompt, reply=content, error=e)
+    content = invoke_llm(retry, agent="parser", response_format=PARSER_RESPONSE_FORMAT)
+    return validate_parsed(content), "llm_retry"
 
-        if "problem_text" not in parsed:
-            parsed["problem_text"] = text
 
-        return parsed
+@timed("parser")
+def run_parser_agent(raw_text):
+    """
+    Normalizes the text locally and only asks the LLM to clean it up when it
+    still looks garbled (odd characters, unbalanced brackets, misspelled
+    words). LLM replies must match PARSER_SCHEMA, with one corrective retry.
+    """
+    text = normalize(raw_text)
+    local = {
+        "problem_text": text,
+        "topic": guess_topic(text),
+        "needs_clarification": needs_clarification(text),
+    }
+    reasons = llm_reasons(text)
+    metrics.record_cache("parser_local", not reasons)
+    if not reasons:
+        record_parse("local")
+        return local
 
+    try:
+        parsed, source = _parse_with_llm(text)
     except Exception as e:
-        print(f"Parsing failed, using raw input. Error: {e}")
-        return {"problem_text": text, "topic": "General", "needs_clarification": False}
+        print(f"Parsing failed, using normalized input. Error: {e}")
+        record_parse("fallback")
+        return local
+
+    record_parse(source)
+    metrics.record("parser", llm_reasons=len(reasons))
+    parsed["problem_text"] = normalize(parsed["problem_text"])
+    if parsed["topic"].strip().lower() in ("", "general", "unknown"):
+        parsed["topic"] = local["topic"]
+    return parsed
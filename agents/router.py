@@ -1,5 +1,7 @@
-from .base import get_llm
-from langchain_core.prompts import PromptTemplate
+from .base import invoke_llm, PromptTemplate
+from .classifier import TOPIC_CLASSIFIER, CONFIDENCE_THRESHOLD, record_route
+import metrics
+from metrics import timed
 
 ROUTER_PROMPT = PromptTemplate(
     input_variables=["problem_text"],
@@ -22,67 +24,23 @@ ROUTER_PROMPT = PromptTemplate(
 )
 
 
+@timed("router")
 def run_router_agent(problem_text):
-    text_lower = problem_text.lower()
+    topic, confidence, _ = TOPIC_CLASSIFIER.classify(problem_text)
+    if topic is not None and confidence >= CONFIDENCE_THRESHOLD:
+        record_route("keyword")
+        metrics.record("router", confidence=confidence)
+        metrics.record_cache("router_keywords", True)
+        return topic
 
-    if any(
-        x in text_lower
-        for x in [
-            "dy/dx",
-            "integrate",
-            "derivative",
-            "area under curve",
-            "l'hopital",
-            "taylor series",
-        ]
-    ):
-        return "CALCULUS"
-
-    if any(
-        x in text_lower
-        for x in [
-            "eigenvalue",
-            "eigenvector",
-            "determinant",
-            "matrix multiplication",
-            "row echelon",
-            "linear map",
-        ]
-    ):
-        return "LINEAR_ALGEBRA"
+    metrics.record_cache("router_keywords", False)
 
-    if any(
-        x in text_lower
-        for x in [
-            "probability",
-            "conditional distribution",
-            "random variable",
-            "bayes",
-            "variance",
-            "standard deviation",
-        ]
-    ):
-        return "PROBABILITY"
-
-    if any(
-        x in text_lower
-        for x in [
-            "triangle",
-            "circle",
-            "radius",
-            "hypotenuse",
-            "volume of",
-            "surface area",
-            "perimeter",
-        ]
-    ):
-        return "GEOMETRY"
+    record_route("llm")
 
     try:
-        llm = get_llm()
-        response = llm.invoke(ROUTER_PROMPT.format(problem_text=problem_text))
-
-        category = response if isinstance(response, str) else response.content
+        category = invoke_llm(
+            ROUTER_PROMPT.format(problem_text=problem_text), agent="router"
+        )
         category = category.strip().upper().replace(".", "")
 
         valid_topics = [
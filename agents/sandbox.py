@@ -0,0 +1,249 @@
+import io
+import os
+import queue
+import signal
+import atexit
+import builtins
+import threading
+import multiprocessing
+from contextlib import redirect_stdout
+
+SANDBOX_WORKERS = max(1, min(4, os.cpu_count() or 1))
+CPU_SECONDS_PER_JOB = 10
+MEMORY_BYTES_PER_WORKER = 1024 * 1024 * 1024
+WALL_TIMEOUT_SECONDS = 20
+
+SYMPY_NAMES = [
+    "symbols",
+    "Function",
+    "dsolve",
+    "Eq",
+    "Derivative",
+    "integrate",
+    "diff",
+    "solve",
+    "sin",
+    "cos",
+    "tan",
+    "exp",
+    "log",
+]
+
+SAFE_BUILTINS = [
+    "abs",
+    "all",
+    "any",
+    "bool",
+    "dict",
+    "divmod",
+    "enumerate",
+    "filter",
+    "float",
+    "int",
+    "isinstance",
+    "len",
+    "list",
+    "map",
+    "max",
+    "min",
+    "pow",
+    "print",
+    "range",
+    "reversed",
+    "round",
+    "set",
+    "sorted",
+    "str",
+    "sum",
+    "tuple",
+    "zip",
+    "Exception",
+    "ValueError",
+    "ZeroDivisionError",
+]
+
+IMPORTABLE_MODULES = {"math", "cmath", "fractions", "itertools", "statistics", "sympy"}
+
+
+class CPUTimeExceeded(Exception):
+    pass
+
+
+def _restricted_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if name.split(".")[0] not in IMPORTABLE_MODULES:
+        raise ImportError(f"Import of '{name}' is not allowed in the sandbox")
+    return builtins.__import__(name, globals, locals, fromlist, level)
+
+
+def _sandbox_globals(use_sympy):
+    import math
+
+    safe_builtins = {name: getattr(builtins, name) for name in SAFE_BUILTINS}
+    safe_builtins["__import__"] = _restricted_import
+    safe_globals = {"math": math, "__builtins__": safe_builtins}
+
+    if use_sympy:
+        import sympy
+
+        safe_globals["sympy"] = sympy
+        safe_globals.update({name: getattr(sympy, name) for name in SYMPY_NAMES})
+
+    return safe_globals
+
+
+def _on_cpu_limit(signum, frame):
+    raise CPUTimeExceeded("CPU time limit exceeded")
+
+
+def _limit_resources(memory_bytes):
+    try:
+        import resource
+    except ImportError:  # Not available on Windows; the wall-clock timeout still applies.
+        return None
+
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    return resource
+
+
+def _worker_main(conn, cpu_seconds, memory_bytes):
+    """Worker loop: receives (code, use_sympy), replies (output, error)."""
+    import sympy  # noqa: F401  Imported once here instead of on every job.
+
+    resource = _limit_resources(memory_bytes)
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        code_str, use_sympy = job
+        if resource is not None:
+            # RLIMIT_CPU counts the whole process lifetime, so re-arm it per job.
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            used = int(usage.ru_utime + usage.ru_stime)
+            resource.setrlimit(
+                resource.RLIMIT_CPU, (used + cpu_seconds, resource.RLIM_INFINITY)
+            )
+
+        output = io.StringIO()
+        try:
+            with redirect_stdout(output):
+                exec(code_str, _sandbox_globals(use_sympy))
+            reply = (output.getvalue().strip(), None)
+        except MemoryError:
+            reply = (None, "Memory limit exceeded.")
+        except BaseException as e:
+            reply = (None, str(e) or type(e).__name__)
+        conn.send(reply)
+
+
+class SandboxPool:
+    """
+    Pre-started worker processes for running generated code. Each job gets
+    its own process-local stdout, a CPU-time and address-space limit, and a
+    wall-clock timeout after which the worker is killed and replaced.
+    """
+
+    def __init__(
+        self,
+        size=SANDBOX_WORKERS,
+        cpu_seconds=CPU_SECONDS_PER_JOB,
+        memory_bytes=MEMORY_BYTES_PER_WORKER,
+        timeout=WALL_TIMEOUT_SECONDS,
+    ):
+        methods = multiprocessing.get_all_start_methods()
+        if "forkserver" in methods:
+            self._context = multiprocessing.get_context("forkserver")
+            # Workers fork from a server that already has SymPy imported.
+            self._context.set_forkserver_preload(["sympy", __name__])
+        else:
+            self._context = multiprocessing.get_context("spawn")
+
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.timeout = timeout
+        self.respawns = 0
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.cpu_seconds, self.memory_bytes),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        worker = (process, parent_conn)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _replace(self, worker):
+        process, conn = worker
+        process.kill()
+        process.join(timeout=1)
+        conn.close()
+        with self._lock:
+            self._workers.remove(worker)
+            self.respawns += 1
+        return self._spawn()
+
+    def run(self, code_str, use_sympy=False, timeout=None):
+        """Blocks for a free worker, so concurrency is bounded by the pool size."""
+        timeout = timeout or self.timeout
+        worker = self._idle.get()
+        try:
+            process, conn = worker
+            if not process.is_alive():
+                worker = self._replace(worker)
+                process, conn = worker
+
+            conn.send((code_str, use_sympy))
+            if conn.poll(timeout):
+                return conn.recv()
+
+            worker = self._replace(worker)
+            return None, f"Execution timed out after {timeout}s."
+        except (EOFError, OSError) as e:
+            # The worker died mid-job (e.g. killed by the OS for exceeding a limit).
+            worker = self._replace(worker)
+            return None, f"Sandbox worker crashed: {e or type(e).__name__}"
+        finally:
+            self._idle.put(worker)
+
+    def shutdown(self):
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for process, conn in workers:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            process.join(timeout=1)
+            if process.is_alive():
+                process.kill()
+            conn.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool()
+            atexit.register(_pool.shutdown)
+        return _pool
@@ -1,27 +1,11 @@
-import math
 import re
-import sys
-import io
-
-import sympy
-from sympy import (
-    symbols,
-    Function,
-    dsolve,
-    Eq,
-    Derivative,
-    sin,
-    cos,
-    tan,
-    exp,
-    log,
-    integrate,
-    diff,
-    solve,
-)
 
-from .base import get_llm
-from langchain_core.prompts import PromptTemplate
+from .base import invoke_llm, TimedStream, PromptTemplate
+from .sandbox import get_sandbox_pool
+from .code_cache import cached_execution, get_generated_code, remember_generated_code
+from .classifier import TOPIC_CLASSIFIER
+from .symbolic import PREAMBLE as SYMBOLIC_PREAMBLE, recognize
+import metrics
 from rag_engine import retrieve_context
 
 BASIC_CODE_PROMPT = PromptTemplate(
@@ -81,92 +65,138 @@ SOLVER_PROMPT = PromptTemplate(
 )
 
 
+@metrics.timed("code_execution")
 def execute_generated_code(code_str, use_sympy=False):
     """
-    Executes AI-generated code.
+    Executes AI-generated code in an isolated worker process (see agents.sandbox).
     If use_sympy=True, it injects the entire SymPy library into the execution sandbox.
     """
     if any(x in code_str for x in ["os.", "sys.", "subprocess", "open("]):
         return None, "Unsafe code detected."
 
-    old_stdout = sys.stdout
-    redirected_output = sys.stdout = io.StringIO()
-
-    try:
-        safe_globals = {"math": math, "__builtins__": {}}
-
-        if use_sympy:
-            safe_globals.update(
-                {
-                    "sympy": sympy,
-                    "symbols": symbols,
-                    "Function": Function,
-                    "dsolve": dsolve,
-                    "Eq": Eq,
-                    "Derivative": Derivative,
-                    "integrate": integrate,
-                    "diff": diff,
-                    "solve": solve,
-                    "sin": sin,
-                    "cos": cos,
-                    "tan": tan,
-                    "exp": exp,
-                    "log": log,
-                }
-            )
+    return cached_execution(code_str, use_sympy, get_sandbox_pool().run)
 
-        exec(code_str, safe_globals)
-        sys.stdout = old_stdout
-        return redirected_output.getvalue().strip(), None
-    except Exception as e:
-        sys.stdout = old_stdout
-        return None, str(e)
 
+# Code-computed answers are formatted as
+# "**<label>:**\n`<result>`\n\n**Code:**\n```python\n<code>\n```".
+COMPUTED_SOLUTION = re.compile(
+    r"^\*\*(?P<label>[^*\n]+):\*\*\n`(?P<result>[^`]*)`\n\n"
+    r"\*\*Code:\*\*\n```python\n(?P<code>.*)\n```$",
+    re.DOTALL,
+)
 
-def run_solver_agent(problem_text, topic):
-    llm = get_llm()
-
-    if topic == "CALCULUS" or any(
-        w in problem_text.lower()
-        for w in ["differential", "derivative", "integrate", "integral", "dy/dx"]
-    ):
-        code_response = llm.invoke(SYMPY_PROMPT.format(problem_text=problem_text))
-        content = (
-            code_response if isinstance(code_response, str) else code_response.content
+
+def computed_result(solution):
+    """
+    Trace of a solution the solver computed by running code: a dict with the
+    label, the printed result and the code. None for step-by-step LLM text.
+    """
+    match = COMPUTED_SOLUTION.match(str(solution).strip())
+    return match.groupdict() if match else None
+
+
+def _generate_and_run(prompt, prompt_name, problem_text, use_sympy):
+    """
+    Asks the LLM for code (or reuses a reply that worked before for the same
+    problem) and runs it. Returns (code, result), both None on failure.
+    """
+    content = get_generated_code(prompt_name, problem_text)
+    from_cache = content is not None
+    if not from_cache:
+        content = invoke_llm(
+            prompt.format(problem_text=problem_text), agent="code_generation"
         )
-        match = re.search(r"```python(.*?)```", content, re.DOTALL)
-
-        if match:
-            code = match.group(1).strip()
-            result, error = execute_generated_code(code, use_sympy=True)
-            if result:
-                return (
-                    f"**Symbolic Solution (via SymPy):**\n`{result}`\n\n**Code:**\n```python\n{code}\n```",
-                    ["Generated SymPy Code"],
-                )
-            else:
-                pass
+
+    match = re.search(r"```python(.*?)```", content, re.DOTALL)
+    if not match:
+        return None, None
+
+    code = match.group(1).strip()
+    result, error = execute_generated_code(code, use_sympy=use_sympy)
+    if result and not from_cache:
+        remember_generated_code(prompt_name, problem_text, content)
+    return code, result
+
+
+def _solve_directly(problem_text):
+    """Parses common problem forms straight into SymPy, skipping the LLM entirely."""
+    task = recognize(problem_text)
+    if task is None:
+        metrics.record_cache("symbolic_fast_path", False)
+        return None
+
+    code = task["code"]
+    result, error = execute_generated_code(SYMBOLIC_PREAMBLE + code, use_sympy=True)
+    metrics.record_cache("symbolic_fast_path", bool(result))
+    if not result:
+        print(f"Symbolic fast path failed ({task['kind']}): {error}")
+        return None
+
+    return (
+        f"**Symbolic Solution (direct SymPy, {task['kind']}):**\n`{result}`\n\n**Code:**\n```python\n{code}\n```",
+        ["Direct SymPy Evaluation"],
+    )
+
+
+def _solve_with_code(problem_text, topic):
+    """Returns (solution, context) when generated code yields a result, else None."""
+    solved = _solve_directly(problem_text)
+    if solved:
+        return solved
+
+    if topic == "CALCULUS" or TOPIC_CLASSIFIER.scores(problem_text).get("CALCULUS"):
+        code, result = _generate_and_run(
+            SYMPY_PROMPT, "sympy", problem_text, use_sympy=True
+        )
+        if result:
+            return (
+                f"**Symbolic Solution (via SymPy):**\n`{result}`\n\n**Code:**\n```python\n{code}\n```",
+                ["Generated SymPy Code"],
+            )
 
     elif topic in ["PROBABILITY", "ALGEBRA", "LINEAR_ALGEBRA"]:
-        code_response = llm.invoke(BASIC_CODE_PROMPT.format(problem_text=problem_text))
-        content = (
-            code_response if isinstance(code_response, str) else code_response.content
+        code, result = _generate_and_run(
+            BASIC_CODE_PROMPT, "basic", problem_text, use_sympy=False
         )
-        match = re.search(r"```python(.*?)```", content, re.DOTALL)
-
-        if match:
-            code = match.group(1).strip()
-            result, error = execute_generated_code(code, use_sympy=False)
-            if result:
-                return (
-                    f"**Calculated Answer:**\n`{result}`\n\n**Code:**\n```python\n{code}\n```",
-                    ["Generated Python Code"],
-                )
-
-    context = retrieve_context(problem_text)
+        if result:
+            return (
+                f"**Calculated Answer:**\n`{result}`\n\n**Code:**\n```python\n{code}\n```",
+                ["Generated Python Code"],
+            )
+
+    return None
+
+
+@metrics.timed("solver")
+def run_solver_agent(problem_text, topic):
+    solved = _solve_with_code(problem_text, topic)
+    if solved:
+        return solved
+
+    context = retrieve_context(problem_text, topic=topic)
     context_str = "\n".join(context)
-    response = llm.invoke(
-        SOLVER_PROMPT.format(problem_text=problem_text, context=context_str)
+    response = invoke_llm(
+        SOLVER_PROMPT.format(problem_text=problem_text, context=context_str),
+        agent="solver",
     )
 
-    return (response if isinstance(response, str) else response.content), context
+    return response, context
+
+
+def stream_solver_agent(problem_text, topic):
+    """
+    Like run_solver_agent, but the step-by-step LLM fallback comes back as a
+    TimedStream instead of a string. Code-computed answers are returned as text.
+    """
+    with metrics.stage("solver"):
+        solved = _solve_with_code(problem_text, topic)
+        if solved:
+            return solved
+
+        context = retrieve_context(problem_text, topic=topic)
+    context_str = "\n".join(context)
+    stream = TimedStream(
+        SOLVER_PROMPT.format(problem_text=problem_text, context=context_str),
+        agent="solver",
+    )
+    return stream, context
@@ -0,0 +1,300 @@
+"""
+Deterministic front-end for problems SymPy can solve directly.
+
+Common phrasings ("integrate x^2 sin x", "solve x^2-5x+6=0", "limit of
+sin(x)/x as x -> 0", "dy/dx = x + y", "probability of exactly 3 heads in
+5 tosses") are recognized with regexes and turned into a short SymPy
+script, which runs in the sandbox like LLM-generated code. Anything that
+does not match cleanly returns None so the caller can fall back to the LLM.
+"""
+
+import re
+
+KNOWN_WORDS = {
+    "sin",
+    "cos",
+    "tan",
+    "cot",
+    "sec",
+    "csc",
+    "asin",
+    "acos",
+    "atan",
+    "sinh",
+    "cosh",
+    "tanh",
+    "log",
+    "ln",
+    "exp",
+    "sqrt",
+    "pi",
+    "abs",
+    "oo",
+}
+
+EXPRESSION_CHARS = re.compile(r"^[0-9a-z\s\+\-\*/\^\(\)\.,=']+$")
+WORD = re.compile(r"[a-z]{2,}")
+
+PREAMBLE = """from sympy.parsing.sympy_parser import parse_expr, standard_transformations, implicit_multiplication_application, convert_xor
+T = standard_transformations + (implicit_multiplication_application, convert_xor)
+L = {"ln": log, "e": sympy.E}
+def P(s):
+    return parse_expr(s, local_dict=L, transformations=T)
+"""
+
+# Single letters that are constants, never unknowns: P() maps "e" to E and
+# "i" reads as the imaginary unit ("pi" is a word and never a single letter).
+RESERVED_LETTERS = {"e", "i"}
+
+VARIABLE = r"(?P<var>[a-z])"
+RESPECT_TO = rf"(?:\s+(?:with respect to|wrt|w\.r\.t\.?)\s+{VARIABLE})?"
+
+DERIVATIVE = re.compile(
+    r"^(?:the\s+)?(?P<order>second\s+|2nd\s+|third\s+|3rd\s+)?"
+    r"(?:derivative(?:\s+of)?|differentiate)\s+(?P<expr>.+?)" + RESPECT_TO + r"$"
+)
+DDX = re.compile(r"^d(?:\^?(?P<order>[23]))?/d(?P<var>[a-z])(?:\^?[23])?\s*(?P<expr>.+)$")
+INTEGRAL = re.compile(
+    r"^(?:the\s+)?(?:integrate|integral\s+of|antiderivative\s+of|anti-derivative\s+of)\s+"
+    r"(?P<expr>.+?)(?:\s*d(?P<dvar>[a-z]))?"
+    r"(?:\s+from\s+(?P<lower>.+?)\s+to\s+(?P<upper>.+?))?" + RESPECT_TO + r"$"
+)
+LIMIT = re.compile(
+    r"^(?:the\s+)?limit\s+(?:of\s+)?(?P<expr>.+?)\s+as\s+(?P<var>[a-z])\s*"
+    r"(?:->|→|approaches|tends\s+to|goes\s+to)\s*(?P<point>.+)$"
+)
+ODE_MARKERS = re.compile(r"dy/dx|d2y/dx2|y''|y'")
+# LEADING has already stripped "find", so "find the roots of" arrives as "the roots of".
+SOLVE = re.compile(
+    r"^(?:solve|(?:the\s+)?(?:roots?|solutions?)\s+(?:of|to))"
+    r"(?:\s+the)?(?:\s+(?:system(?:\s+of\s+equations)?|equations?|polynomial))?"
+    r"(?:\s+for\s+(?P<vars>[a-z](?:\s*(?:,|and)\s*[a-z])*))?\s*:?\s*(?P<eqs>.+)$"
+)
+# The probability forms are anchored at both ends like the others: any
+# extra condition ("given that...", "if two refuse...") must reach the LLM.
+COIN = re.compile(
+    r"^(?:the\s+)?probability\s+of\s+(?:getting\s+)?"
+    r"(?P<mode>exactly|at\s+least|at\s+most)\s+(?P<k>\d+)\s+"
+    r"(?:heads|tails|head|tail)\s+(?:in|when\s+tossing|with|from)\s+"
+    r"(?P<n>\d+)\s+(?:fair\s+)?(?:coin\s+)?(?:tosses|flips|coins|throws)"
+    r"(?:\s+of\s+a\s+fair\s+coin)?$"
+)
+BINOMIAL = re.compile(
+    r"^(?:the\s+)?probability\s+of\s+(?P<mode>exactly|at\s+least|at\s+most)\s+"
+    r"(?P<k>\d+)\s+successes?\s+in\s+(?P<n>\d+)\s+(?:independent\s+)?trials?"
+    r"\s*,?\s*(?:with|where|each\s+with)\s+"
+    r"(?:p\s*=|(?:a\s+)?(?:success\s+)?probability\s+(?:of\s+success\s+)?(?:is\s+|=\s*|of\s+)?)"
+    r"\s*(?P<p>\d*\.?\d+)$"
+)
+CHOOSE = re.compile(
+    r"^(?:(?P<n1>\d+)\s*(?:c|choose)\s*(?P<k1>\d+)"
+    r"|(?:(?:the\s+)?number\s+of\s+|how\s+many\s+)?ways\s+(?:are\s+there\s+)?to\s+"
+    r"(?:choose|select|pick)\s+(?P<k2>\d+)\s+(?:\w+\s+)?(?:from|out\s+of)\s+"
+    r"(?P<n2>\d+)(?:\s+\w+)?)$"
+)
+EXTRA_CLAUSE = re.compile(
+    r"\b(?:given|if|such\s+that|except|without|unless|provided|but|not|"
+    r"at\s+(?:most|least)\s+one|together|adjacent|consecutive|in\s+a\s+row)\b"
+)
+LEADING = re.compile(
+    r"^(?:please\s+)?(?:find|compute|calculate|evaluate|determine|what\s+is|what's)\s+"
+)
+
+
+def _clean(text):
+    text = " ".join(str(text).lower().split())
+    text = text.replace("×", "*").replace("÷", "/").replace("−", "-").replace("²", "^2")
+    text = text.replace("³", "^3").replace("∞", "oo").replace("π", "pi")
+    text = re.sub(r"\binfinity\b|\binf\b", "oo", text)
+    text = text.rstrip("?.! ")
+    return LEADING.sub("", text)
+
+
+def _looks_symbolic(expr):
+    """Rejects prose: only math characters and known function names are allowed."""
+    if not expr or "__" in expr or not EXPRESSION_CHARS.match(expr):
+        return False
+    return all(word in KNOWN_WORDS for word in WORD.findall(expr))
+
+
+def _free_letters(expr):
+    return [
+        letter
+        for letter in re.findall(r"[a-z]", WORD.sub(" ", expr))
+        if letter not in RESERVED_LETTERS
+    ]
+
+
+def _guess_variable(expr):
+    letters = _free_letters(expr)
+    for candidate in ("x", "t", "y", "z", "u", "n"):
+        if candidate in letters:
+            return candidate
+    return letters[0] if letters else "x"
+
+
+def _order(word):
+    if not word:
+        return 1
+    return 2 if word.strip() in ("second", "2nd", "2") else 3
+
+
+def _task(kind, code, **fields):
+    return {"kind": kind, "code": code, **fields}
+
+
+def _derivative(text):
+    match = DERIVATIVE.match(text) or DDX.match(text)
+    if not match or not _looks_symbolic(match.group("expr")):
+        return None
+    expr = match.group("expr")
+    var = match.group("var") or _guess_variable(expr)
+    order = _order(match.group("order"))
+    code = f"{var} = symbols({var!r})\nprint(diff(P({expr!r}), {var}, {order}))"
+    return _task("derivative", code, expression=expr, variable=var, order=order)
+
+
+def _integral(text):
+    match = INTEGRAL.match(text)
+    if not match:
+        return None
+    expr, lower, upper = match.group("expr", "lower", "upper")
+    if not all(_looks_symbolic(part) for part in (expr, lower or "0", upper or "0")):
+        return None
+    var = match.group("var") or match.group("dvar") or _guess_variable(expr)
+    if lower is not None:
+        bounds = f"({var}, P({lower!r}), P({upper!r}))"
+    else:
+        bounds = var
+    code = f"{var} = symbols({var!r})\nprint(integrate(P({expr!r}), {bounds}))"
+    return _task(
+        "integral", code, expression=expr, variable=var, lower=lower, upper=upper
+    )
+
+
+def _limit(text):
+    match = LIMIT.match(text)
+    if not match:
+        return None
+    expr, var, point = match.group("expr", "var", "point")
+    if not (_looks_symbolic(expr) and _looks_symbolic(point)):
+        return None
+    code = f"{var} = symbols({var!r})\nprint(sympy.limit(P({expr!r}), {var}, P({point!r})))"
+    return _task("limit", code, expression=expr, variable=var, point=point)
+
+
+def _split_equation(equation):
+    left, _, right = equation.partition("=")
+    return left.strip(), (right.strip() or "0")
+
+
+def _ode(text):
+    if not ODE_MARKERS.search(text) or "=" not in text:
+        return None
+    equation = re.sub(
+        r"^(?:solve\s+)?(?:the\s+)?(?:differential\s+equation|ode)?\s*:?\s*", "", text
+    )
+    equation = re.sub(r"d2y/dx2|y''", " D2 ", equation)
+    equation = re.sub(r"dy/dx|y'", " D1 ", equation)
+    if not _looks_symbolic(equation.replace("D1", "").replace("D2", "")):
+        return None
+    equation = re.sub(r"\by\b", "y(x)", equation)
+    equation = equation.replace("D1", "Derivative(y(x), x)")
+    equation = equation.replace("D2", "Derivative(y(x), x, 2)")
+    left, right = _split_equation(equation)
+    code = (
+        "x = symbols('x')\n"
+        "L['y'] = Function('y')\n"
+        f"print(dsolve(Eq(P({left!r}), P({right!r})), Function('y')(x)))"
+    )
+    return _task("ode", code, equation=[left, right])
+
+
+def _solve(text):
+    match = SOLVE.match(text)
+    if not match:
+        return None
+    parts = [
+        part.strip()
+        for part in re.split(r",|;|\band\b", match.group("eqs"))
+        if part.strip()
+    ]
+    if not parts or not all(_looks_symbolic(part) for part in parts):
+        return None
+    equations = [list(_split_equation(part)) for part in parts]
+    names = re.findall(r"[a-z]", match.group("vars") or "")
+    if not names:
+        # No unknown at all ("solve 3 = 3") is not a root-finding problem.
+        names = sorted(set(_free_letters(" ".join(parts))))
+        if not names:
+            return None
+    code = (
+        f"unknowns = symbols({' '.join(names)!r}, seq=True)\n"
+        f"equations = [Eq(P(l), P(r)) for l, r in {equations!r}]\n"
+        "print(solve(equations, unknowns, dict=len(unknowns) > 1) if len(equations) > 1 "
+        "else solve(equations[0], *unknowns))"
+    )
+    return _task("solve", code, equations=equations, variables=names)
+
+
+def _binomial_code(mode, n, k, p):
+    if mode == "exactly":
+        terms = f"[{k}]"
+    elif mode.startswith("at least"):
+        terms = f"range({k}, {n} + 1)"
+    else:
+        terms = f"range(0, {k} + 1)"
+    return (
+        f"p = sympy.nsimplify({p!r})\n"
+        f"r = sum(sympy.binomial({n}, i) * p**i * (1 - p)**({n} - i) for i in {terms})\n"
+        "print(f'{r} ≈ {float(r):.6g}')"
+    )
+
+
+def _probability(text):
+    if EXTRA_CLAUSE.search(text):
+        return None
+    match = COIN.match(text)
+    if match:
+        mode, k, n = " ".join(match.group("mode").split()), *match.group("k", "n")
+        return _task(
+            "binomial",
+            _binomial_code(mode, int(n), int(k), "1/2"),
+            mode=mode,
+            n=int(n),
+            k=int(k),
+            p="1/2",
+        )
+
+    match = BINOMIAL.match(text)
+    if match:
+        mode = " ".join(match.group("mode").split())
+        n, k, p = int(match.group("n")), int(match.group("k")), match.group("p")
+        return _task(
+            "binomial", _binomial_code(mode, n, k, p), mode=mode, n=n, k=k, p=p
+        )
+
+    match = CHOOSE.match(text)
+    if match:
+        n = int(match.group("n1") or match.group("n2"))
+        k = int(match.group("k1") or match.group("k2"))
+        return _task("combination", f"print(math.comb({n}, {k}))", n=n, k=k)
+    return None
+
+
+def has_extra_clauses(problem_text):
+    """True when the text adds conditions ("given", "if", "except"...) to a form."""
+    return bool(EXTRA_CLAUSE.search(_clean(problem_text)))
+
+
+RECOGNIZERS = [_ode, _derivative, _integral, _limit, _solve, _probability]
+
+
+def recognize(problem_text):
+    """Returns a task dict (kind, code, parsed fields) or None if no form matches."""
+    text = _clean(problem_text)
+    for recognizer in RECOGNIZERS:
+        task = recognizer(text)
+        if task is not None:
+            return task
+    return None
@@ -0,0 +1,346 @@
+"""
+Local checks for answers the solver computed with code.
+
+The problem is recognized again with agents.symbolic, and the printed
+result is checked by a different route than the one that produced it:
+antiderivatives are differentiated, derivatives compared with finite
+differences, roots substituted back into their equations, ODE solutions
+passed to checkodesol, and probabilities estimated by Monte Carlo. SymPy
+checks run in the sandbox (the result string is untrusted); the numeric
+simulations run here with NumPy. Anything that cannot be checked this way
+is reported as inconclusive so the caller can ask the LLM instead.
+"""
+
+import random
+
+from .sandbox import get_sandbox_pool
+from .solver import computed_result
+from .symbolic import PREAMBLE, has_extra_clauses, recognize
+
+CHECK_TIMEOUT_SECONDS = 10
+CHECK_SEED = 0
+NUMERIC_POINTS = 6
+# Random points are drawn from here: positive, so log/sqrt stay real.
+POINT_RANGE = (0.25, 2.75)
+RELATIVE_TOLERANCE = 1e-6
+LIMIT_TOLERANCE = 1e-4
+MONTE_CARLO_TRIALS = 200_000
+
+# R() parses SymPy's own printed output, so no implicit multiplication
+# (which would split names like C1). close() is None when either side is
+# not a finite number.
+CHECK_PREAMBLE = PREAMBLE + """def R(s):
+    return parse_expr(s, local_dict=L, transformations=standard_transformations + (convert_xor,))
+def close(a, b, tol):
+    difference = sympy.N(abs(a - b), 50)
+    size = sympy.N(abs(b), 50)
+    if not (difference.is_finite and size.is_finite):
+        return None
+    return bool(difference <= tol * max(1, size))
+"""
+
+# Compares lhs(p) with rhs(p) at each random point; skips points where
+# either side is undefined.
+POINTWISE_CHECK = """
+checked = 0
+for point in POINTS:
+    p = sympy.Rational(point)
+    ok = close(lhs(p), rhs(p), TOL)
+    if ok is None:
+        continue
+    if not ok:
+        print(f"FAIL: {WHAT} differs at {VAR} = {point}")
+        break
+    checked += 1
+else:
+    if checked >= 2:
+        print(f"PASS: {WHAT} agrees at {checked} random points")
+    else:
+        print(f"SKIP: {WHAT} is undefined at the sample points")
+"""
+
+
+def _points(seed_text):
+    rng = random.Random(f"{CHECK_SEED}\x00{seed_text}")
+    return [f"{rng.uniform(*POINT_RANGE):.4f}" for _ in range(NUMERIC_POINTS)]
+
+
+def _pointwise(task, result, setup, what):
+    var = task["variable"]
+    return (
+        CHECK_PREAMBLE
+        + f"{var} = sympy.Symbol({var!r})\n"
+        + f"f = P({task['expression']!r})\n"
+        + f"g = R({result!r})\n"
+        + setup
+        + f"POINTS = {_points(task['expression'])!r}\n"
+        + f"TOL = {RELATIVE_TOLERANCE!r}\nVAR = {var!r}\nWHAT = {what!r}\n"
+        + POINTWISE_CHECK
+    )
+
+
+def _derivative_script(task, result):
+    # Central differences at 50 digits; h**2 truncation error is ~1e-16.
+    setup = f"""k = {task['order']}
+h = sympy.Rational(1, 10**8)
+def lhs(p):
+    return sum(
+        (-1) ** i * sympy.binomial(k, i) * f.subs({task['variable']}, p + (sympy.Rational(k, 2) - i) * h)
+        for i in range(k + 1)
+    ) / h**k
+def rhs(p):
+    return g.subs({task['variable']}, p)
+"""
+    return "finite differences", _pointwise(
+        task, result, setup, "finite-difference derivative"
+    )
+
+
+def _integral_script(task, result):
+    var = task["variable"]
+    if task.get("lower") is not None:
+        script = (
+            CHECK_PREAMBLE
+            + f"{var} = sympy.Symbol({var!r})\n"
+            + f"f = P({task['expression']!r})\n"
+            + f"g = R({result!r})\n"
+            + f"area = sympy.Integral(f, ({var}, P({task['lower']!r}), P({task['upper']!r}))).evalf(30)\n"
+            + f"""ok = close(area, g, {RELATIVE_TOLERANCE!r})
+if ok is None:
+    print("SKIP: numeric quadrature did not converge")
+elif ok:
+    print(f"PASS: numeric quadrature gives {{sympy.N(area, 12)}}")
+else:
+    print(f"FAIL: numeric quadrature gives {{sympy.N(area, 12)}}")
+"""
+        )
+        return "numeric quadrature", script
+
+    setup = f"""dg = sympy.diff(g, {var})
+def lhs(p):
+    return dg.subs({var}, p)
+def rhs(p):
+    return f.subs({var}, p)
+"""
+    return "differentiated antiderivative", _pointwise(
+        task, result, setup, "derivative of the antiderivative vs the integrand"
+    )
+
+
+def _limit_script(task, result):
+    var = task["variable"]
+    script = (
+        CHECK_PREAMBLE
+        + f"{var} = sympy.Symbol({var!r})\n"
+        + f"f = P({task['expression']!r})\n"
+        + f"g = R({result!r})\n"
+        + f"a = P({task['point']!r})\n"
+        + f"""if a in (sympy.oo, -sympy.oo):
+    sign = 1 if a == sympy.oo else -1
+    near = [sign * sympy.Integer(10) ** 9, sign * sympy.Integer(10) ** 10]
+else:
+    near = [a - sympy.Rational(1, 10**9), a + sympy.Rational(1, 10**9)]
+# Floats, not exact rationals: (1 + 1/n)**n at n = 10**9 is a huge fraction.
+values = [sympy.N(f.subs({var}, sympy.Float(v, 50)), 50) for v in near]
+if not all(value.is_finite for value in values):
+    print("SKIP: expression is undefined next to the point")
+elif g in (sympy.oo, -sympy.oo):
+    grows = all(abs(value) > 10**6 and (value > 0) == (g > 0) for value in values)
+    print("PASS: values diverge as expected" if grows else "SKIP: divergence not evident")
+elif close(values[0], values[1], {LIMIT_TOLERANCE!r}) is not True:
+    print("SKIP: values on either side disagree")
+elif close(values[0], g, {LIMIT_TOLERANCE!r}):
+    print(f"PASS: nearby values approach {{sympy.N(values[0], 8)}}")
+else:
+    print(f"FAIL: nearby values approach {{sympy.N(values[0], 8)}}")
+"""
+    )
+    return "numeric limit", script
+
+
+def _ode_script(task, result):
+    left, right = task["equation"]
+    script = (
+        CHECK_PREAMBLE
+        + "x = sympy.Symbol('x')\n"
+        + "L['y'] = sympy.Function('y')\n"
+        + f"equation = sympy.Eq(P({left!r}), P({right!r}))\n"
+        + f"found = R({result!r})\n"
+        + """solutions = found if isinstance(found, (list, tuple)) else [found]
+failed = [s for s in solutions if not sympy.checkodesol(equation, s)[0]]
+if failed:
+    print(f"FAIL: {failed[0]} does not satisfy the ODE")
+else:
+    print(f"PASS: checkodesol confirms {len(solutions)} solution(s)")
+"""
+    )
+    return "checkodesol", script
+
+
+def _solve_script(task, result):
+    names = " ".join(task["variables"])
+    script = (
+        CHECK_PREAMBLE
+        + f"unknowns = sympy.symbols({names!r}, seq=True)\n"
+        + f"equations = [P(l) - P(r) for l, r in {task['equations']!r}]\n"
+        + f"found = R({result!r})\n"
+        + """if isinstance(found, dict):
+    found = [found]
+solutions = []
+verdict = None
+for item in found if isinstance(found, (list, tuple)) else [found]:
+    if isinstance(item, dict):
+        solutions.append(item)
+    elif isinstance(item, (list, tuple)):
+        if len(item) != len(unknowns):
+            verdict = f"FAIL: {item} does not match the unknowns {unknowns}"
+        solutions.append(dict(zip(unknowns, item)))
+    else:
+        solutions.append({unknowns[0]: item})
+
+# R() reads a bogus unknown such as "e" back as the constant E, which would
+# then substitute cleanly; only the equations' own free symbols may be solved for.
+free = set().union(*(equation.free_symbols for equation in equations))
+for solution in solutions:
+    if verdict is None and not set(solution) <= free:
+        verdict = f"FAIL: {solution} solves for something that is not an unknown"
+
+for solution in [] if verdict else solutions:
+    for equation in equations:
+        residual = sympy.simplify(equation.subs(solution))
+        if residual == 0:
+            continue
+        if not residual.is_number:
+            verdict = "SKIP: residual still depends on free symbols"
+        elif abs(sympy.N(residual, 50)) > 1e-12:
+            verdict = f"FAIL: {solution} leaves a residual of {sympy.N(residual, 6)}"
+            break
+    if verdict and verdict.startswith("FAIL"):
+        break
+
+if verdict is None and not solutions:
+    verdict = "SKIP: no solutions to substitute"
+if verdict is None and len(equations) == 1 and len(unknowns) == 1:
+    # Distinct roots of a polynomial = degree of its square-free part.
+    expression = sympy.together(equations[0])
+    numerator = sympy.numer(expression)
+    if numerator.is_polynomial(unknowns[0]):
+        expected = sympy.degree(sympy.sqf_part(numerator), unknowns[0])
+        if len(solutions) < expected:
+            verdict = f"FAIL: found {len(solutions)} of {expected} roots"
+if verdict is None:
+    verdict = f"PASS: {len(solutions)} solution(s) substituted back give zero"
+print(verdict)
+"""
+    )
+    return "substitution", script
+
+
+SCRIPTS = {
+    "derivative": _derivative_script,
+    "integral": _integral_script,
+    "limit": _limit_script,
+    "ode": _ode_script,
+    "solve": _solve_script,
+}
+
+
+def _number(result):
+    """Float value of a printed probability ("5/16 ≈ 0.3125", "0.3125" or "5/16")."""
+    from fractions import Fraction
+
+    text = result.split("≈")[-1].strip()
+    try:
+        return float(Fraction(text))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def _monte_carlo_binomial(task, result):
+    import numpy as np
+    from fractions import Fraction
+
+    expected = _number(result)
+    if expected is None:
+        return None, "result is not a number"
+    n, k, mode = task["n"], task["k"], task["mode"]
+    p = float(Fraction(task["p"]))
+    rng = np.random.default_rng(CHECK_SEED)
+    # One binomial draw per experiment: cost does not grow with n.
+    successes = rng.binomial(n, p, MONTE_CARLO_TRIALS)
+    if mode == "exactly":
+        hits = int((successes == k).sum())
+    elif mode.startswith("at least"):
+        hits = int((successes >= k).sum())
+    else:
+        hits = int((successes <= k).sum())
+    estimate = hits / MONTE_CARLO_TRIALS
+    # Four standard errors, plus a floor for probabilities near 0 or 1.
+    tolerance = 4 * (estimate * (1 - estimate) / MONTE_CARLO_TRIALS) ** 0.5 + 1e-3
+    detail = f"{MONTE_CARLO_TRIALS} simulated experiments give {estimate:.4f}"
+    return abs(estimate - expected) <= tolerance, detail
+
+
+def _recount_combination(task, result):
+    n, k = task["n"], task["k"]
+    try:
+        value = int(result.strip())
+    except ValueError:
+        return None, "result is not an integer"
+    if n > 5000:
+        return None, "too large to recount"
+    row = [1]
+    for _ in range(n):
+        row = [1] + [row[i] + row[i + 1] for i in range(len(row) - 1)] + [1]
+    expected = row[k] if 0 <= k <= n else 0
+    return value == expected, f"Pascal's triangle gives {expected}"
+
+
+LOCAL_CHECKS = {
+    "binomial": ("monte carlo", _monte_carlo_binomial),
+    "combination": ("pascal recount", _recount_combination),
+}
+
+
+def check_solution(problem_text, solution):
+    """
+    Checks a code-computed solution locally. Returns (status, method,
+    details) where status is "pass", "fail", or None when the solution
+    could not be checked (not computed by code, an unrecognized problem,
+    one with conditions the recognizer does not model, or a check that was
+    itself inconclusive).
+    """
+    trace = computed_result(solution)
+    if trace is None:
+        return None, None, "solution was not computed by code"
+    # A pass only means something when the recognizer read the whole
+    # problem; extra conditions it does not model go to the LLM.
+    if has_extra_clauses(problem_text):
+        return None, None, "problem has conditions the local check does not model"
+    task = recognize(problem_text)
+    if task is None or task["kind"] not in {**SCRIPTS, **LOCAL_CHECKS}:
+        return None, None, "no local check for this kind of problem"
+
+    result = trace["result"].strip()
+    if task["kind"] in LOCAL_CHECKS:
+        method, check = LOCAL_CHECKS[task["kind"]]
+        try:
+            ok, details = check(task, result)
+        except Exception as e:
+            return None, method, f"check failed: {e}"
+        if ok is None:
+            return None, method, details
+        return ("pass" if ok else "fail"), method, details
+
+    method, script = SCRIPTS[task["kind"]](task, result)
+    output, error = get_sandbox_pool().run(
+        script, use_sympy=True, timeout=CHECK_TIMEOUT_SECONDS
+    )
+    if error or not output:
+        return None, method, f"check failed: {error or 'no output'}"
+    status, _, details = output.splitlines()[-1].partition(": ")
+    if status == "PASS":
+        return "pass", method, details
+    if status == "FAIL":
+        return "fail", method, details
+    return None, method, details
@@ -1,5 +1,10 @@
-from .base import get_llm
-from langchain_core.prompts import PromptTemplate
+import time
+import threading
+
+from .base import invoke_llm, PromptTemplate
+from .verification import check_solution
+import metrics
+from metrics import timed
 
 VERIFIER_PROMPT = PromptTemplate(
     input_variables=["problem_text", "solution"],
@@ -8,10 +13,77 @@ VERIFIER_PROMPT = PromptTemplate(
     Problem: {problem_text}
     Solution: {solution}
     Strictly check for logical errors. Output 'VERIFIED_CORRECT' or 'VERIFIED_INCORRECT'.
-    """
+    """,
 )
 
+_stats_lock = threading.Lock()
+_stats = {"local": 0, "llm": 0}
+
+
+def record_verification(source):
+    with _stats_lock:
+        _stats[source] = _stats.get(source, 0) + 1
+
+
+def verification_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    total = sum(stats.values())
+    for source in list(stats):
+        stats[f"{source}_rate"] = stats[source] / total if total else 0.0
+    return stats
+
+
+def _llm_verdict(reply):
+    reply = reply.upper()
+    if "VERIFIED_INCORRECT" in reply:
+        return "VERIFIED_INCORRECT"
+    if "VERIFIED_CORRECT" in reply:
+        return "VERIFIED_CORRECT"
+    return "UNVERIFIED"
+
+
+@timed("verifier")
 def run_verifier_agent(problem_text, solution):
-    llm = get_llm()
-    response = llm.invoke(VERIFIER_PROMPT.format(problem_text=problem_text, solution=solution))
-    return response if isinstance(response, str) else response.content
\ No newline at end of file
+    """
+    Returns a verdict dict: verdict (VERIFIED_CORRECT / VERIFIED_INCORRECT /
+    UNVERIFIED), method, details, checked_locally and seconds. Code-computed
+    answers are checked locally first (see agents.verification); the LLM is
+    only asked when that is inconclusive, and local_check then says why.
+    """
+    started = time.perf_counter()
+    status, method, details = check_solution(problem_text, solution)
+    metrics.record_cache("verifier_local", status is not None)
+
+    if status is not None:
+        record_verification("local")
+        verdict = "VERIFIED_CORRECT" if status == "pass" else "VERIFIED_INCORRECT"
+        return {
+            "verdict": verdict,
+            "method": method,
+            "details": details,
+            "checked_locally": True,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    record_verification("llm")
+    reply = invoke_llm(
+        VERIFIER_PROMPT.format(problem_text=problem_text, solution=solution),
+        agent="verifier",
+    )
+    return {
+        "verdict": _llm_verdict(reply),
+        "method": "llm",
+        "details": reply.strip(),
+        "checked_locally": False,
+        "local_check": f"{method}: {details}" if method else details,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def format_verdict(result):
+    """Markdown for a verdict dict; strings (e.g. cached outcomes) pass through."""
+    if not isinstance(result, dict):
+        return result
+    header = f"**{result['verdict']}** · {result['method']} · {result['seconds']:.2f}s"
+    return f"{header}\n\n{result['details']}"
@@ -0,0 +1,189 @@
+import os
+import re
+import threading
+
+import memory_store
+import metrics
+from cache import LRUCache
+
+# Set MATH_MENTOR_ANSWER_CACHE=0 to send every problem through the full agent pipeline.
+ANSWER_CACHE_ENABLED = os.environ.get("MATH_MENTOR_ANSWER_CACHE", "1") != "0"
+SIMILARITY_THRESHOLD = 0.92
+CACHE_SIZE = 512
+CACHE_TTL_SECONDS = 60 * 60
+
+# Embeddings barely move when only a number changes ("x^2-5x+6=0" vs
+# "x^2-5x+4=0"), so a semantic hit must also have the same numbers,
+# operators, variables and functions, in the same order.
+_MATH_TOKEN = re.compile(
+    r"\d+(?:\.\d+)?|[=<>+\-*/^()!%]"
+    r"|\b(?:sin|cos|tan|log|ln|exp|sqrt)\b|(?<![a-z])[b-z](?![a-z])"
+)
+
+# Only hits are cached: a miss may turn into a hit after the next saved
+# solution. Stored answers only go stale through forget(), which empties it.
+_hits = LRUCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL_SECONDS)
+
+_index_lock = threading.Lock()
+_index = {"last_id": 0, "vectors": None, "entries": []}
+
+
+def _as_hit(entry, match, score):
+    return {
+        "problem_text": entry["parsed_question"],
+        "topic": entry.get("topic"),
+        "final_answer": entry["final_answer"],
+        "verifier_outcome": entry.get("verifier_outcome"),
+        "retrieved_context": entry.get("retrieved_context") or [],
+        "memory_id": entry.get("memory_id"),
+        "match": match,
+        "score": score,
+    }
+
+
+def is_verified(outcome):
+    """
+    True only for a VERIFIED_CORRECT verdict: a verifier dict, or the plain
+    or formatted verdict text older entries were saved with.
+    """
+    if isinstance(outcome, dict):
+        return outcome.get("verdict") == "VERIFIED_CORRECT"
+    text = str(outcome or "").upper()
+    return "VERIFIED_CORRECT" in text and "VERIFIED_INCORRECT" not in text
+
+
+def _refresh_index():
+    """Embeds questions of verified positive entries saved since the last refresh."""
+    import numpy as np
+    from rag_engine import get_embeddings
+
+    entries = list(
+        memory_store.iter_entries(feedback="positive", after_id=_index["last_id"])
+    )
+    if not entries:
+        return
+    _index["last_id"] = entries[-1]["memory_id"]
+    new_entries = [e for e in entries if is_verified(e.get("verifier_outcome"))]
+    if not new_entries:
+        return
+
+    vectors = get_embeddings().embed_documents(
+        [memory_store.normalize_question(e["parsed_question"]) for e in new_entries]
+    )
+    vectors = np.asarray(vectors, dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+
+    if _index["vectors"] is None:
+        _index["vectors"] = vectors
+    else:
+        _index["vectors"] = np.vstack([_index["vectors"], vectors])
+    _index["entries"].extend(new_entries)
+
+
+def math_tokens(text):
+    """Numbers, operators, single-letter variables and functions, in order."""
+    return _MATH_TOKEN.findall(memory_store.normalize_question(text))
+
+
+def _semantic_match(problem_text, threshold):
+    import numpy as np
+    from rag_engine import get_embeddings
+
+    with _index_lock:
+        _refresh_index()
+        if _index["vectors"] is None:
+            return None
+        vectors, entries = _index["vectors"], _index["entries"]
+
+    query = np.asarray(
+        get_embeddings().embed_query(memory_store.normalize_question(problem_text)),
+        dtype=np.float32,
+    )
+    query /= np.linalg.norm(query) + 1e-12
+
+    scores = vectors @ query
+    tokens = math_tokens(problem_text)
+    for best in np.argsort(-scores):
+        if scores[best] < threshold:
+            break
+        if math_tokens(entries[best]["parsed_question"]) == tokens:
+            return _as_hit(entries[best], "semantic", float(scores[best]))
+    return None
+
+
+@metrics.timed("answer_cache")
+def lookup(problem_text, bypass=False, threshold=SIMILARITY_THRESHOLD):
+    """
+    Returns a previously verified answer for this problem, or None. Only
+    positively rated entries whose verifier said VERIFIED_CORRECT are served.
+    Exact matches on the normalized text win; otherwise the closest positively
+    rated question is used if its cosine similarity clears the threshold and
+    its math tokens (numbers, operators, variables) are identical.
+    """
+    if bypass or not ANSWER_CACHE_ENABLED:
+        return None
+
+    key = memory_store.question_hash(problem_text)
+    hit = _hits.get(key)
+    if hit is not None:
+        metrics.record_cache("answer_cache", True)
+        return hit
+
+    try:
+        exact = [
+            entry
+            for entry in memory_store.find_by_question(
+                problem_text, feedback="positive"
+            )
+            if is_verified(entry.get("verifier_outcome"))
+        ]
+        if exact:
+            hit = _as_hit(exact[0], "exact", 1.0)
+        else:
+            hit = _semantic_match(problem_text, threshold)
+    except Exception as e:
+        print(f"Answer Cache Error: {e}")
+        return None
+
+    if hit is not None:
+        _hits.set(key, hit)
+    metrics.record_cache("answer_cache", hit is not None)
+    return hit
+
+
+def forget(problem_text):
+    """
+    Stops serving stored answers for this question (after the user rejected
+    one): its positive memory entries are demoted to negative and dropped
+    from the semantic index, and the hit cache is emptied, since other
+    questions may map to the same entry.
+    """
+    hit = _hits.get(memory_store.question_hash(problem_text))
+    memory_ids = {hit["memory_id"]} if hit and hit.get("memory_id") else set()
+    try:
+        memory_ids.update(
+            entry["memory_id"]
+            for entry in memory_store.find_by_question(
+                problem_text, feedback="positive"
+            )
+        )
+        for memory_id in memory_ids:
+            memory_store.set_feedback(memory_id, "negative")
+    except Exception as e:
+        print(f"Answer Cache Error: {e}")
+    _hits.clear()
+
+    with _index_lock:
+        keep = [
+            i
+            for i, entry in enumerate(_index["entries"])
+            if entry.get("memory_id") not in memory_ids
+        ]
+        if len(keep) < len(_index["entries"]):
+            _index["entries"] = [_index["entries"][i] for i in keep]
+            _index["vectors"] = _index["vectors"][keep] if keep else None
+    return sorted(memory_ids)
+
+
+def cache_stats():
+    return {**_hits.stats(), "indexed_questions": len(_index["entries"])}
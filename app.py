@@ -1,14 +1,28 @@
 import streamlit as st
 import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
-from utils import process_image, process_audio
+import metrics
+import llm_cache
+import warmup
+from utils import process_image, stream_audio
 from rag_engine import init_vector_store, save_full_memory_trace
+from answer_cache import lookup as lookup_cached_answer, forget as forget_cached_answer
+from memory_store import question_hash
 
-from agents.parser import run_parser_agent
+from agents.parser import run_parser_agent, parser_stats
 from agents.router import run_router_agent
-from agents.solver import run_solver_agent
-from agents.verifier import run_verifier_agent
-from agents.explainer import run_explainer_agent
+from agents.classifier import routing_stats
+from agents.solver import run_solver_agent, stream_solver_agent
+from agents.explainer import stream_explainer_agent
+from agents.verifier import format_verdict, verification_stats
+from agents.orchestrator import (
+    POST_SOLVE_TIMEOUTS,
+    run_post_solve_agents,
+    submit_post_solve_agent,
+)
+from agents.base import TimedStream
+from agents.code_cache import forget_generated_code
 
 st.set_page_config(
     page_title="Math Mentor AI",
@@ -37,11 +51,49 @@ if "raw_input" not in st.session_state:
     st.session_state.raw_input = ""
 if "logs" not in st.session_state:
     st.session_state.logs = []
+if "request_metrics" not in st.session_state:
+    st.session_state.request_metrics = metrics.RequestMetrics()
+
+# Every stage recorded during this script run lands on the current request.
+metrics.activate(st.session_state.request_metrics)
+# LLM replies are tagged with the problem once it is known (step 3).
+llm_cache.set_scope(None)
+
+
+def reset_to_start():
+    st.session_state.step = 1
+    st.session_state.raw_input = ""
+    st.session_state.pop("step3_results", None)
+    st.session_state.request_metrics = metrics.RequestMetrics()
+
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    # Runs once per server process; models load while the user types.
+    return warmup.start(background=True)
+
+
+start_warm_up()
 
 with st.sidebar:
     st.title("⚙️ System Internals")
     st.markdown("Live trace of agent activities:")
     log_container = st.container()
+    with st.expander("⏱️ Stage Metrics (this request)"):
+        metrics_container = st.empty()
+    st.checkbox(
+        "Bypass answer cache",
+        key="bypass_answer_cache",
+        help="Always run the full agent pipeline and ask the LLM again, "
+        "even for problems solved before.",
+    )
+    llm_cache.set_bypass(st.session_state.bypass_answer_cache)
+    st.checkbox(
+        "Stream responses",
+        value=True,
+        key="stream_responses",
+        help="Render the solver fallback and the explanation token by token.",
+    )
 
     def add_log(message):
         st.session_state.logs.append(message)
@@ -84,15 +136,15 @@ if st.session_state.step == 1:
         if audio_file:
             if st.button("Transcribe"):
                 with st.spinner("👂 Audio Agent listening..."):
-                    # Save temp file for whisper
-                    with open("temp.mp3", "wb") as f:
-                        f.write(audio_file.getbuffer())
-                    text, err = process_audio("temp.mp3")
-                    if not err:
-                        captured_text = text
+                    # Decoded in memory by the shared service; text appears chunk by chunk.
+                    try:
+                        with metrics.stage("transcription"):
+                            job = stream_audio(audio_file)
+                            st.write_stream(job)
+                        captured_text = job.text
                         add_log("✅ Audio Agent: Transcription complete")
-                    else:
-                        st.error(f"Audio Error: {err}")
+                    except Exception as e:
+                        st.error(f"Audio Error: {e}")
 
     # Processing Trigger
     if captured_text or st.session_state.raw_input:
@@ -142,68 +194,211 @@ elif st.session_state.step == 2:
             st.rerun()
 
         if st.button("❌ Restart", use_container_width=True):
-            st.session_state.step = 1
-            st.session_state.raw_input = ""
+            reset_to_start()
             st.rerun()
 
 elif st.session_state.step == 3:
     problem = st.session_state.parsed_data["problem_text"]
+    problem_key = question_hash(problem)
+    llm_cache.set_scope(problem_key)
+
+    # Feedback buttons trigger a rerun; reuse what we already computed and showed
+    # for this problem instead of calling every agent again.
+    memo = st.session_state.get("step3_results")
+    if memo and memo["problem_hash"] != problem_key:
+        memo = None
+
+    streaming = st.session_state.get("stream_responses", True)
+
+    if memo is None:
+        # --- PHASE 1: MAIN SOLVER (Fast) ---
+        # We use a status container for the critical path only
+        with st.status("🧠 Orchestrating Agents...", expanded=True) as status:
+            # 0. Answer Cache
+            st.write("🗂️ **Memory Agent**: Checking verified answers...")
+            cached = lookup_cached_answer(
+                problem, bypass=st.session_state.get("bypass_answer_cache", False)
+            )
 
-    # --- PHASE 1: MAIN SOLVER (Fast) ---
-    # We use a status container for the critical path only
-    with st.status("🧠 Orchestrating Agents...", expanded=True) as status:
-        # 1. Memory Init
-        st.write("📚 **Memory Agent**: Accessing Knowledge Base...")
-        init_vector_store()
-
-        # 2. Router
-        st.write("🔀 **Router Agent**: Analyzing complexity...")
-        topic = run_router_agent(problem)
-        st.info(f"👉 Routing to **{topic}** Specialist")
-        time.sleep(0.3)  # UI Pacing
-
-        # 3. Solver
-        st.write(f"💡 **Solver Agent**: Computing answer...")
-        solution, context = run_solver_agent(problem, topic)
+            if cached:
+                topic = cached["topic"]
+                solution = cached["final_answer"]
+                context = cached["retrieved_context"]
+                st.info(
+                    f"♻️ Reusing a verified solution ({cached['match']} match, "
+                    f"score {cached['score']:.2f})"
+                )
+                add_log(f"♻️ Answer Cache: {cached['match']} hit")
+            else:
+                # 1. Memory Init
+                st.write("📚 **Memory Agent**: Accessing Knowledge Base...")
+                init_vector_store()
+
+                # 2. Router
+                st.write("🔀 **Router Agent**: Analyzing complexity...")
+                topic = run_router_agent(problem)
+                st.info(f"👉 Routing to **{topic}** Specialist")
+                time.sleep(0.3)  # UI Pacing
+
+                # 3. Solver
+                st.write(f"💡 **Solver Agent**: Computing answer...")
+                if streaming:
+                    solution, context = stream_solver_agent(problem, topic)
+                else:
+                    solution, context = run_solver_agent(problem, topic)
+
+            status.update(
+                label="✅ Solution Generated!", state="complete", expanded=False
+            )
 
-        status.update(label="✅ Solution Generated!", state="complete", expanded=False)
+        memo = {
+            "problem_hash": problem_key,
+            "topic": topic,
+            "solution": solution,
+            "context": context,
+            "cache_match": cached["match"] if cached else None,
+            "verifier": cached["verifier_outcome"] if cached else None,
+            "explainer": None,
+            # Failures are kept apart so memo[agent] stays None and is retried.
+            "errors": {},
+            "timings": {},
+        }
+        fresh_run = True
+    else:
+        fresh_run = False
+
+    # Stored before the secondary agents run, so an interrupting rerun keeps the
+    # solver output and only the unfinished agents are retried.
+    st.session_state.step3_results = memo
+
+    topic = memo["topic"]
+    solution = memo["solution"]
+    context = memo["context"]
 
     # --- PHASE 2: DISPLAY SOLUTION (Immediate) ---
     col_main, col_details = st.columns([2, 1])
 
     with col_main:
         st.subheader("📝 Final Solution")
-        st.success(solution)
+        if isinstance(solution, TimedStream):
+            stream = solution
+            st.write_stream(stream)
+            solution = memo["solution"] = stream.text
+        else:
+            st.success(solution)
 
         # --- PHASE 3: SECONDARY AGENTS (Lazy Loading) ---
         # The user sees the solution above immediately.
         # The expander below will show a loading state while the extra agents run.
 
-        with st.expander("🔎 View Verification & Explanation (Analysis running...)"):
-            # 1. VERIFIER LOADING STATE
+        with st.expander("🔎 View Verification & Explanation", expanded=not fresh_run):
+            # Both agents only need the problem and the solution, so they run
+            # concurrently and each placeholder fills as soon as its agent returns.
             st.markdown("### 🛡️ Verifier Report")
-            verify_placeholder = st.empty()  # Create a placeholder
-
-            with verify_placeholder.container():
-                with st.spinner("🕵️ Verifier Agent is checking logic..."):
-                    # This runs while the spinner is visible
-                    verification_result = run_verifier_agent(problem, solution)
-
-            # Update placeholder with final result
-            verify_placeholder.write(verification_result)
+            verify_placeholder = st.empty()
 
             st.divider()
 
-            # 2. EXPLAINER LOADING STATE
             st.markdown("### 👨‍🏫 Teacher Explanation")
             explain_placeholder = st.empty()
 
-            with explain_placeholder.container():
-                with st.spinner("🎓 Explainer Agent is drafting notes..."):
-                    explanation_result = run_explainer_agent(problem, solution)
+            placeholders = {
+                "verifier": verify_placeholder,
+                "explainer": explain_placeholder,
+            }
+            pending = []
+            for agent, placeholder in placeholders.items():
+                if memo[agent] is not None:
+                    placeholder.write(
+                        format_verdict(memo[agent])
+                        if agent == "verifier"
+                        else memo[agent]
+                    )
+                else:
+                    pending.append(agent)
+
+            if "verifier" in pending:
+                verify_placeholder.info("🕵️ Verifier Agent is checking logic...")
+            if "explainer" in pending:
+                explain_placeholder.info("🎓 Explainer Agent is drafting notes...")
+
+            if pending and streaming and "explainer" in pending:
+                # The explainer streams on this thread while the verifier runs on
+                # the pool; its placeholder is filled between explainer chunks.
+                started = time.perf_counter()
+                background = {}
+                if "verifier" in pending:
+                    background["verifier"] = submit_post_solve_agent(
+                        "verifier", problem, solution
+                    )
+
+                def collect_verifier(block=False):
+                    verifier_future = background.get("verifier")
+                    if verifier_future is None:
+                        return
+                    remaining = POST_SOLVE_TIMEOUTS["verifier"] - (
+                        time.perf_counter() - started
+                    )
+                    if not block and not verifier_future.done() and remaining > 0:
+                        return
+                    try:
+                        # The verdict dict is kept (and saved) as is; only the
+                        # display is formatted.
+                        result = verifier_future.result(timeout=max(0, remaining))
+                        verify_placeholder.write(format_verdict(result))
+                        memo["verifier"] = result
+                        memo["errors"].pop("verifier", None)
+                    except Exception as e:
+                        reason = "timed out" if isinstance(e, FutureTimeoutError) else e
+                        memo["errors"]["verifier"] = str(reason)
+                        verify_placeholder.warning(f"⚠️ Verifier unavailable: {reason}")
+                    add_log(
+                        f"✅ Verifier: finished in {time.perf_counter() - started:.1f}s"
+                    )
+                    background.pop("verifier")
+
+                stream = stream_explainer_agent(problem, solution)
+
+                def explainer_chunks():
+                    for chunk in stream:
+                        collect_verifier()
+                        yield chunk
+                        elapsed = time.perf_counter() - started
+                        if elapsed > POST_SOLVE_TIMEOUTS["explainer"]:
+                            memo["errors"]["explainer"] = "timed out"
+                            yield "\n\n⚠️ Explanation cut short (timed out)."
+                            break
+
+                try:
+                    memo["errors"].pop("explainer", None)
+                    with explain_placeholder.container():
+                        st.write_stream(explainer_chunks())
+                    if "explainer" not in memo["errors"]:
+                        memo["explainer"] = stream.text
+                    add_log(f"✅ Explainer: first token after {stream.ttft or 0:.1f}s")
+                except Exception as e:
+                    memo["errors"]["explainer"] = str(e)
+                    explain_placeholder.warning(f"⚠️ Explainer unavailable: {e}")
+                collect_verifier(block=True)
+
+            elif pending:
+                for agent, result, error, elapsed in run_post_solve_agents(
+                    problem, solution, agents=pending
+                ):
+                    if error:
+                        memo["errors"][agent] = str(error)
+                        placeholders[agent].warning(
+                            f"⚠️ {agent.title()} unavailable: {error}"
+                        )
+                    else:
+                        placeholders[agent].write(
+                            format_verdict(result) if agent == "verifier" else result
+                        )
+                        memo[agent] = result
+                        memo["errors"].pop(agent, None)
+                    add_log(f"✅ {agent.title()}: finished in {elapsed:.1f}s")
 
-            # Update placeholder
-            explain_placeholder.write(explanation_result)
+    verification_result = memo["verifier"]
 
     # --- RIGHT PANEL: DEBUG INFO ---
     with col_details:
@@ -215,13 +410,27 @@ elif st.session_state.step == 3:
         else:
             st.caption("No RAG context needed.")
 
+        # Every agent has run once, whether it succeeded or failed.
+        finished = all(
+            memo[agent] is not None or agent in memo["errors"]
+            for agent in ("verifier", "explainer")
+        )
+        if finished and not memo.get("exported"):
+            # Every stage of this request has run; ship it to the metrics log once.
+            memo["timings"] = st.session_state.request_metrics.summary()
+            metrics.export_request(st.session_state.request_metrics)
+            memo["exported"] = True
+
         st.markdown("**Agent Latency:**")
         st.json(
             {
                 "Topic": topic,
-                "Solver": "Active",
-                "Verifier": "Complete",
-                "Explainer": "Complete",
+                "Answer Cache": memo["cache_match"] or "miss",
+                **{
+                    stage: f"{totals['seconds']:.2f}s"
+                    for stage, totals in memo["timings"].items()
+                    if "seconds" in totals
+                },
             }
         )
 
@@ -252,22 +461,37 @@ elif st.session_state.step == 3:
                 "✅ Pattern memorized! The system will use this logic for similar future problems."
             )
             time.sleep(2)
-            st.session_state.step = 1
-            st.session_state.raw_input = ""
+            reset_to_start()
             st.rerun()
 
     with col_feed2:
         if st.button("👎 No, Incorrect (Discard)"):
+            # Don't hand the same replies, generated code or stored answer back.
+            llm_cache.forget_scope(problem_key)
+            forget_generated_code(problem)
+            if memo["cache_match"]:
+                forget_cached_answer(problem)
             st.warning(
                 "❌ Feedback noted. This solution will NOT be added to long-term memory."
             )
             time.sleep(2)
-            st.session_state.step = 1
-            st.session_state.raw_input = ""
+            reset_to_start()
             st.rerun()
 
     st.write("---")
     if st.button("🔄 Solve Another Problem (No Save)", use_container_width=True):
-        st.session_state.step = 1
-        st.session_state.raw_input = ""
+        reset_to_start()
         st.rerun()
+
+with metrics_container.container():
+    st.json(st.session_state.request_metrics.summary(), expanded=False)
+    st.caption("Router (this server process):")
+    st.json(routing_stats(), expanded=False)
+    st.caption("Parser (this server process):")
+    st.json(parser_stats(), expanded=False)
+    st.caption("Verifier (this server process):")
+    st.json(verification_stats(), expanded=False)
+    st.caption("LLM response cache (this server process):")
+    st.json(llm_cache.cache_stats(), expanded=False)
+    st.caption("Warm-up (this server process):")
+    st.json(warmup.status(), expanded=False)
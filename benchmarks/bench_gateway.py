@@ -0,0 +1,136 @@
+"""
+Benchmark the LLM gateway against the local fake Groq server.
+
+Fires concurrent completions (a share of them identical) from worker
+threads and compares the gateway with a naive client that opens a new
+connection per call and never retries. Reports latency percentiles, error
+counts, server-side requests and connections, retries and coalesced calls:
+
+    python -m benchmarks.bench_gateway --requests 200 --workers 32 --error-rate 0.1
+"""
+
+import time
+import random
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+import metrics
+from agents.gateway import LLMGateway
+from benchmarks.fake_groq_server import FakeGroqServer
+from benchmarks.bench_pipeline import synthetic_problem
+
+
+def make_prompts(count, duplicate_share, seed=0):
+    rng = random.Random(seed)
+    prompts = []
+    for _ in range(count):
+        if prompts and rng.random() < duplicate_share:
+            prompts.append(rng.choice(prompts))
+        else:
+            prompts.append(
+                f"Solve this math problem.\nProblem: {synthetic_problem(rng)}"
+            )
+    return prompts
+
+
+def naive_call(base_url, prompt):
+    response = httpx.post(
+        f"{base_url}/chat/completions",
+        json={"model": "fake", "messages": [{"role": "user", "content": prompt}]},
+        timeout=60,
+    )
+    response.raise_for_status()
+    return response.json()["choices"][0]["message"]["content"]
+
+
+def run(label, call, prompts, workers, server):
+    before = dict(server.stats)
+
+    def timed_call(prompt):
+        started = time.perf_counter()
+        try:
+            call(prompt)
+            return time.perf_counter() - started, None
+        except Exception as e:
+            return time.perf_counter() - started, e
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(timed_call, prompts))
+    elapsed = time.perf_counter() - started
+
+    latencies = [seconds for seconds, error in results if error is None]
+    errors = sum(1 for _, error in results if error is not None)
+    row = {
+        "p50": metrics.percentile(latencies, 50) if latencies else 0.0,
+        "p95": metrics.percentile(latencies, 95) if latencies else 0.0,
+        "p99": metrics.percentile(latencies, 99) if latencies else 0.0,
+        "rps": len(prompts) / elapsed,
+        "errors": errors,
+        **{key: server.stats[key] - before[key] for key in server.stats},
+    }
+    print(
+        f"{label:<10}"
+        + "".join(
+            f"{value:>12.3f}" if isinstance(value, float) else f"{value:>12}"
+            for value in row.values()
+        )
+    )
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--duplicates", type=float, default=0.3)
+    parser.add_argument("--retry-after", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    server = FakeGroqServer(
+        latency=args.latency, error_rate=args.error_rate, retry_after=args.retry_after
+    ).start()
+    prompts = make_prompts(args.requests, args.duplicates)
+    gateway = LLMGateway(
+        "fake-key",
+        base_url=server.base_url,
+        requests_per_minute=100_000,
+        tokens_per_minute=10_000_000,
+    )
+
+    columns = [
+        "p50",
+        "p95",
+        "p99",
+        "rps",
+        "errors",
+        "requests",
+        "rejected",
+        "connections",
+    ]
+    print(f"{'client':<10}" + "".join(f"{c:>12}" for c in columns))
+    report = {}
+    try:
+        report["naive"] = run(
+            "naive",
+            lambda p: naive_call(server.base_url, p),
+            prompts,
+            args.workers,
+            server,
+        )
+        report["gateway"] = run(
+            "gateway", gateway.invoke, prompts, args.workers, server
+        )
+        print(f"\ngateway stats: {gateway.stats}")
+    finally:
+        gateway.close()
+        server.stop()
+    return report
+
+
+if __name__ == "__main__":
+    main()
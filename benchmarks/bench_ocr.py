@@ -0,0 +1,124 @@
+"""
+Benchmark OCR latency and character accuracy on the sample images.
+
+Compares the original single-call approach (grayscale + one
+pytesseract.image_to_string on the full image) with ocr.extract_text, cold
+and from its content-hash cache. Accuracy is 1 - edit distance / reference
+length after collapsing whitespace. From the repository root:
+
+    python -m benchmarks.bench_ocr --repeat 5
+"""
+
+import time
+import argparse
+
+from PIL import Image
+
+import metrics
+import ocr
+from cache import PersistentLRUCache
+
+# What a careful reader would type for each image, in reading order.
+REFERENCES = {
+    "test.png": "x3 +2\nlim\nx→2 x+1",
+    "test2.png": "x2 - 4x + 3\n(a) lim\nx→2 x - 1",
+    "test_p.png": (
+        "• A jar contains 30 red marbles, 12 yellow\n"
+        "marbles, 8 green marbles and 5 blue marbles\n"
+        "• What is the probability that you draw and\n"
+        "replace marbles 3 times and you get NO red\n"
+        "marbles?\n"
+        "• There are 55 marbles, 25 of which are not red\n"
+        "• P(getting a color other than red) = P(25/55) ≈ .455\n"
+        "• Probability of this happening 3 times in a row is\n"
+        "found by .455*.455*.455 ≈ .094"
+    ),
+}
+
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def character_accuracy(text, reference):
+    text = " ".join(text.split())
+    reference = " ".join(reference.split())
+    if not reference:
+        return 1.0
+    return max(0.0, 1.0 - edit_distance(text, reference) / len(reference))
+
+
+def baseline_ocr(path):
+    import pytesseract
+
+    return pytesseract.image_to_string(Image.open(path).convert("L")).strip()
+
+
+def time_runs(func, path, repeat):
+    timings, text = [], ""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        text = func(path)
+        timings.append(time.perf_counter() - started)
+    return text, timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--images", default=",".join(REFERENCES))
+    args = parser.parse_args(argv)
+
+    header = ["image", "method", "p50 ms", "p95 ms", "accuracy"]
+    print(f"{header[0]:<12}{header[1]:<14}" + "".join(f"{h:>12}" for h in header[2:]))
+    report = {}
+    for name in args.images.split(","):
+        reference = REFERENCES.get(name, "")
+        _, preprocess_timings = time_runs(
+            lambda path: ocr.preprocess(Image.open(path)), name, args.repeat
+        )
+        rows = {"preprocess": ("", preprocess_timings)}
+        try:
+            rows["baseline"] = time_runs(baseline_ocr, name, args.repeat)
+
+            def cold(path):
+                # Fresh in-memory cache: nothing from earlier runs or from disk.
+                ocr._results = PersistentLRUCache(None, table="ocr")
+                return ocr.extract_text(path)
+
+            rows["pipeline"] = time_runs(cold, name, args.repeat)
+            rows["cached"] = time_runs(ocr.extract_text, name, args.repeat)
+        except Exception as e:
+            print(f"{name:<12}OCR unavailable: {e}")
+
+        for method, (text, timings) in rows.items():
+            accuracy = (
+                character_accuracy(text, reference) if method != "preprocess" else None
+            )
+            report[(name, method)] = {
+                "p50_ms": metrics.percentile(timings, 50) * 1000,
+                "p95_ms": metrics.percentile(timings, 95) * 1000,
+                "accuracy": accuracy,
+            }
+            row = report[(name, method)]
+            print(
+                f"{name:<12}{method:<14}{row['p50_ms']:>12.1f}{row['p95_ms']:>12.1f}"
+                + (f"{accuracy:>12.3f}" if accuracy is not None else f"{'-':>12}")
+            )
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Measure how often the parser resolves input without the LLM.
+
+Runs agents.parser.run_parser_agent over the router benchmark problems
+plus OCR/ASR-style inputs (Unicode operators, superscripts, bullets,
+misread digits, garbled words) and reports the local hit rate, LLM calls
+and latency, next to sending every input to the LLM as the parser used
+to. The LLM is Groq when GROQ_API_KEY is set, otherwise pass --fake-llm
+to use the offline stand-in. From the repository root:
+
+    python -m benchmarks.bench_parser --fake-llm 0.3
+"""
+
+import time
+import argparse
+
+import metrics
+import llm_cache
+from agents import base, parser as parser_agent
+from agents.base import invoke_llm
+from benchmarks.bench_router import LABELED_PROBLEMS
+from benchmarks.bench_ocr import REFERENCES
+from benchmarks.fake_llm import FakeChatModel
+
+NOISY_INPUTS = [
+    "Find d/dx of x³ − 4x² + 7",
+    "• Evaluate ∫₀¹ x·eˣ dx",
+    "Solve 2x² + 3x − 5 = O",
+    "lim x→∞ (1 + 1/n)ⁿ",
+    "Simplify √(49) ÷ 7 × 1O",
+    "A bag has 1O red and 5 blue balls. Find the proba-\nbility of drawing 2 red.",
+    "Find the derivtve of sn(x) + cs(x)",
+    "wht is th prbblty of gttng 3 hds",
+    "solve (x + 2(x - 1) = 4",
+    "Compute det([[1, 2], [3, 4]]",
+    "x ≥ 3 and x ≤ 7, how many integers x satisfy both?",
+]
+
+
+def corpus():
+    problems = [text for text, _ in LABELED_PROBLEMS]
+    problems.extend(REFERENCES.values())
+    problems.extend(NOISY_INPUTS)
+    return problems
+
+
+def time_all(func, problems):
+    timings = []
+    for text in problems:
+        started = time.perf_counter()
+        func(text)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fake-llm", type=float, metavar="LATENCY")
+    args = parser.parse_args(argv)
+
+    fake = None
+    if args.fake_llm is not None:
+        fake = FakeChatModel(latency=args.fake_llm)
+        base.set_llm(fake)
+    # Every run should pay for its own LLM calls.
+    llm_cache.set_agent_enabled("parser", False)
+
+    problems = corpus()
+    rows = []
+    try:
+        calls_before = fake.calls if fake else 0
+        timings = time_all(
+            lambda text: invoke_llm(
+                parser_agent.PARSER_PROMPT.format(input_text=text), agent="parser"
+            ),
+            problems,
+        )
+        rows.append(("llm always", timings, (fake.calls if fake else 0) - calls_before))
+
+        calls_before = fake.calls if fake else 0
+        timings = time_all(parser_agent.run_parser_agent, problems)
+        rows.append(
+            ("local first", timings, (fake.calls if fake else 0) - calls_before)
+        )
+    finally:
+        base.set_llm(None)
+        llm_cache.set_agent_enabled("parser", True)
+
+    stats = parser_agent.parser_stats()
+    print(f"{len(problems)} inputs, local hit rate {stats['local_rate']:.2f}")
+    print(f"{'method':<14}{'llm calls':>10}{'p50 ms':>10}{'p95 ms':>10}{'total s':>10}")
+    for name, timings, calls in rows:
+        print(
+            f"{name:<14}{calls if fake else '-':>10}"
+            f"{metrics.percentile(timings, 50) * 1000:>10.2f}"
+            f"{metrics.percentile(timings, 95) * 1000:>10.2f}{sum(timings):>10.2f}"
+        )
+    for text in NOISY_INPUTS:
+        reasons = parser_agent.llm_reasons(parser_agent.normalize(text))
+        print(f"  {'llm' if reasons else 'local':<6}{text!r:<60} {', '.join(reasons)}")
+    return {"stats": stats, "rows": rows}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Offline benchmark for the agent pipeline.
+
+Swaps Groq for a deterministic FakeChatModel, replays a problem corpus
+(memory/solution_history.json plus synthetic problems) through parser,
+router, solver, verifier and explainer, and reports per-stage percentiles,
+throughput at several concurrency levels, and vector store build/query
+times as memory grows. Run from the repository root:
+
+    python -m benchmarks.bench_pipeline --latency 0.2 --concurrency 1,4,16
+"""
+
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+import llm_cache
+import embedding_cache
+import memory_store
+import rag_engine
+from agents import base, code_cache
+from agents.parser import run_parser_agent
+from agents.router import run_router_agent
+from agents.solver import run_solver_agent
+from agents.orchestrator import run_post_solve_agents
+from benchmarks.fake_llm import FakeChatModel
+
+SYNTHETIC_PROBLEMS = [
+    "Find the derivative of x^{a} + {b}x + {c}",
+    "Integrate x^{a} sin(x) with respect to x",
+    "Solve x^2 - {b}x + {c} = 0",
+    "A box contains {a} red balls and {b} blue balls. Two are drawn. "
+    "What is the probability both are red?",
+    "Find the determinant of the matrix [[{a}, {b}], [{c}, {a}]]",
+    "What is the area of a circle with radius {a}?",
+    "Find the eigenvalue of [[{a}, 0], [0, {b}]]",
+    "Compute the limit of sin({a}x)/x as x approaches 0",
+]
+
+
+def synthetic_problem(rng):
+    template = rng.choice(SYNTHETIC_PROBLEMS)
+    return template.format(
+        a=rng.randint(2, 9), b=rng.randint(2, 9), c=rng.randint(1, 20)
+    )
+
+
+def load_corpus(size, seed=0):
+    rng = random.Random(seed)
+    problems = []
+    if os.path.exists("./memory/solution_history.json"):
+        with open("./memory/solution_history.json", "r") as f:
+            problems = [entry["parsed_question"] for entry in json.load(f)]
+    while len(problems) < size:
+        problems.append(synthetic_problem(rng))
+    return problems[:size]
+
+
+def synthetic_entries(count, seed=0):
+    rng = random.Random(seed)
+    topics = ["ALGEBRA", "CALCULUS", "PROBABILITY", "GEOMETRY", "LINEAR_ALGEBRA"]
+    for i in range(count):
+        yield {
+            "original_input_type": "Synthetic",
+            "parsed_question": f"{synthetic_problem(rng)} (variant {i})",
+            "topic": rng.choice(topics),
+            "retrieved_context": [],
+            "final_answer": f"Answer {i}",
+            "verifier_outcome": "VERIFIED_CORRECT",
+            "user_feedback": "positive" if rng.random() < 0.8 else "negative",
+        }
+
+
+def use_scratch_storage(workdir):
+    """
+    Points the vector store, memory and every persistent cache (LLM replies,
+    generated code, embeddings) at a throwaway directory, so fake-model
+    output never lands in the caches the app reads.
+    """
+    rag_engine.DB_DIR = os.path.join(workdir, "chroma_db")
+    rag_engine.NUMPY_INDEX_DIR = os.path.join(workdir, "vector_index")
+    memory_store.MEMORY_DB = os.path.join(workdir, "solution_history.db")
+    memory_store.LEGACY_MEMORY_FILE = None
+    llm_cache.set_path(os.path.join(workdir, "llm_cache.db"))
+    code_cache.set_path(os.path.join(workdir, "code_cache.db"))
+    embedding_cache.EMBEDDING_CACHE_PATH = os.path.join(workdir, "embeddings.db")
+    rag_engine._resources.clear()
+
+
+def reset_caches():
+    """Empties the LLM and code caches so a phase pays for its own calls."""
+    llm_cache.clear()
+    code_cache.clear()
+
+
+def run_pipeline(problem):
+    with metrics.request(export=False) as request_metrics:
+        with metrics.stage("total"):
+            parsed = run_parser_agent(problem)
+            topic = run_router_agent(parsed["problem_text"])
+            solution, _ = run_solver_agent(parsed["problem_text"], topic)
+            for _ in run_post_solve_agents(parsed["problem_text"], solution):
+                pass
+    return request_metrics.summary()
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    return {f"p{q}": metrics.percentile(values, q) for q in (50, 95, 99)}
+
+
+def bench_stages(corpus):
+    per_stage = {}
+    for problem in corpus:
+        for stage, totals in run_pipeline(problem).items():
+            if "seconds" in totals:
+                per_stage.setdefault(stage, []).append(totals["seconds"])
+    return {stage: percentiles(values) for stage, values in sorted(per_stage.items())}
+
+
+def bench_throughput(corpus, levels):
+    report = {}
+    for workers in levels:
+        reset_caches()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(run_pipeline, corpus))
+        elapsed = time.perf_counter() - started
+        report[workers] = {"seconds": elapsed, "rps": len(corpus) / elapsed}
+    return report
+
+
+def bench_vector_store(sizes, queries, seed=0):
+    rng = random.Random(seed)
+    report = {}
+    stored = 0
+    entries = synthetic_entries(max(sizes), seed)
+    for size in sorted(sizes):
+        for packet in entries:
+            memory_store.append_entry(packet)
+            stored += 1
+            if stored >= size:
+                break
+
+        started = time.perf_counter()
+        rag_engine.init_vector_store()
+        sync_seconds = time.perf_counter() - started
+
+        timings = []
+        for _ in range(queries):
+            query = synthetic_problem(rng)
+            started = time.perf_counter()
+            rag_engine.retrieve_context(query)
+            timings.append(time.perf_counter() - started)
+
+        report[size] = {"sync_seconds": sync_seconds, **percentiles(timings)}
+    return report
+
+
+def print_table(title, header, rows):
+    print(f"\n{title}")
+    print(f"{header[0]!s:<24}" + "".join(f"{h:>12}" for h in header[1:]))
+    for row in rows:
+        cells = [f"{v:>12.4f}" if isinstance(v, float) else f"{v!s:>12}" for v in row]
+        print(f"{row[0]!s:<24}" + "".join(cells[1:]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="fake LLM seconds per call"
+    )
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--memory-sizes", default="100,1000,10000")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--skip-vector-store", action="store_true")
+    parser.add_argument(
+        "--fake-embeddings",
+        action="store_true",
+        help="use hashed embeddings instead of downloading all-MiniLM-L6-v2",
+    )
+    parser.add_argument("--json", help="also write the full report to this file")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="math-mentor-bench-")
+    use_scratch_storage(workdir)
+    base.set_llm(FakeChatModel(latency=args.latency, jitter=args.jitter))
+    if args.fake_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        rag_engine._resources["embeddings"] = DeterministicFakeEmbedding(size=384)
+    report = {}
+
+    try:
+        rag_engine.init_vector_store()
+        corpus = load_corpus(args.requests)
+
+        report["stages"] = bench_stages(corpus)
+        print_table(
+            "Per-stage latency (seconds)",
+            ["stage", "p50", "p95", "p99"],
+            [[s, r["p50"], r["p95"], r["p99"]] for s, r in report["stages"].items()],
+        )
+
+        levels = [int(n) for n in args.concurrency.split(",")]
+        report["throughput"] = bench_throughput(corpus, levels)
+        print_table(
+            "Throughput",
+            ["workers", "seconds", "req/s"],
+            [[n, r["seconds"], r["rps"]] for n, r in report["throughput"].items()],
+        )
+
+        if not args.skip_vector_store:
+            sizes = [int(n) for n in args.memory_sizes.split(",")]
+            report["vector_store"] = bench_vector_store(sizes, args.queries)
+            print_table(
+                "Vector store vs. memory size",
+                ["entries", "sync s", "query p50", "query p95", "query p99"],
+                [
+                    [n, r["sync_seconds"], r["p50"], r["p95"], r["p99"]]
+                    for n, r in report["vector_store"].items()
+                ],
+            )
+    finally:
+        base.set_llm(None)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
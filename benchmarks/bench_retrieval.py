@@ -0,0 +1,132 @@
+"""
+Compare the Chroma and NumPy retrieval backends.
+
+Indexes the same synthetic memory documents into each backend and reports
+build time, cold open time, single-query latency (with and without a
+metadata filter) and batched query throughput. From the repository root:
+
+    python -m benchmarks.bench_retrieval --sizes 1000,10000
+"""
+
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+import metrics
+import rag_engine
+from benchmarks.bench_pipeline import synthetic_entries, synthetic_problem
+
+BACKENDS = {"chroma": rag_engine.ChromaBackend, "numpy": rag_engine.NumpyBackend}
+
+
+def synthetic_documents(count):
+    from langchain_core.documents import Document
+
+    documents = []
+    for entry in synthetic_entries(count):
+        document = Document(
+            page_content=f"SIMILAR SOLVED PROBLEM:\nQ: {entry['parsed_question']}",
+            metadata={
+                "source": "memory",
+                "type": "solved_example",
+                "feedback": entry["user_feedback"],
+            },
+        )
+        documents.append(document)
+    return documents
+
+
+def bench_backend(name, directory, embeddings, documents, queries, batch_size):
+    ids = [rag_engine._document_id(d) for d in documents]
+
+    started = time.perf_counter()
+    backend = BACKENDS[name](directory, embeddings)
+    for i in range(0, len(ids), rag_engine.INDEX_BATCH_SIZE):
+        batch = slice(i, i + rag_engine.INDEX_BATCH_SIZE)
+        backend.add(ids[batch], documents[batch])
+    build = time.perf_counter() - started
+
+    started = time.perf_counter()
+    backend = BACKENDS[name](directory, embeddings)
+    open_seconds = time.perf_counter() - started
+
+    def latencies(where):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            backend.search(query, k=5, where=where)
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    plain = latencies(None)
+    filtered = latencies({"feedback": "positive"})
+
+    started = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        backend.search_batch(queries[i : i + batch_size], k=5)
+    batched = time.perf_counter() - started
+
+    return {
+        "build_s": build,
+        "open_s": open_seconds,
+        "query_p50_ms": metrics.percentile(plain, 50) * 1000,
+        "query_p95_ms": metrics.percentile(plain, 95) * 1000,
+        "filtered_p50_ms": metrics.percentile(filtered, 50) * 1000,
+        "batch_qps": len(queries) / batched,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1000,10000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--backends", default="chroma,numpy")
+    parser.add_argument(
+        "--fake-embeddings",
+        action="store_true",
+        help="use hashed embeddings instead of downloading all-MiniLM-L6-v2",
+    )
+    args = parser.parse_args(argv)
+
+    if args.fake_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        embeddings = DeterministicFakeEmbedding(size=384)
+    else:
+        embeddings = rag_engine.get_embeddings()
+
+    rng = random.Random(1)
+    queries = [synthetic_problem(rng) for _ in range(args.queries)]
+    columns = ["build_s", "open_s", "query_p50_ms", "query_p95_ms"]
+    columns += ["filtered_p50_ms", "batch_qps"]
+
+    print(f"{'backend':<10}{'docs':>8}" + "".join(f"{c:>16}" for c in columns))
+    report = {}
+    for size in [int(n) for n in args.sizes.split(",")]:
+        documents = synthetic_documents(size)
+        for name in args.backends.split(","):
+            workdir = tempfile.mkdtemp(prefix=f"math-mentor-{name}-")
+            try:
+                row = bench_backend(
+                    name,
+                    os.path.join(workdir, "index"),
+                    embeddings,
+                    documents,
+                    queries,
+                    args.batch_size,
+                )
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            report[(name, size)] = row
+            print(
+                f"{name:<10}{size:>8}" + "".join(f"{row[c]:>16.4f}" for c in columns)
+            )
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Compare topic routing methods on a labeled problem set.
+
+Runs the keyword classifier (at the router's confidence threshold) and the
+LLM router prompt over labeled problems from memory/solution_history.json
+plus a built-in set, and reports coverage, accuracy and per-call latency. The LLM is Groq when GROQ_API_KEY is set, otherwise
+pass --fake-llm to use the offline stand-in. From the repository root:
+
+    python -m benchmarks.bench_router
+"""
+
+import os
+import json
+import time
+import argparse
+
+import metrics
+from agents import base
+from agents.base import invoke_llm
+from agents.router import ROUTER_PROMPT
+from agents.classifier import TOPIC_CLASSIFIER, CONFIDENCE_THRESHOLD
+from benchmarks.fake_llm import FakeChatModel
+
+LABELED_PROBLEMS = [
+    ("Differentiate f(x) = ln(x^2 + 1)", "CALCULUS"),
+    ("Find the area bounded by y = x^2 and y = 4", "CALCULUS"),
+    (
+        "How fast is the radius of a balloon growing when its volume grows at 10 cm^3/s?",
+        "CALCULUS",
+    ),
+    ("Find the Maclaurin expansion of cos x up to x^4", "CALCULUS"),
+    ("Solve 3x - 7 = 11", "ALGEBRA"),
+    ("Factor x^3 - 8", "ALGEBRA"),
+    ("For what values of k does x^2 + kx + 9 have equal roots?", "ALGEBRA"),
+    ("Write (1 + i)^8 in the form a + bi", "ALGEBRA"),
+    (
+        "Three cards are drawn from a deck. What is the chance all are hearts?",
+        "PROBABILITY",
+    ),
+    ("If P(A) = 0.3 and P(B|A) = 0.5, find P(A and B)", "PROBABILITY"),
+    ("A fair die is rolled twice. Find the chance of a double six.", "PROBABILITY"),
+    (
+        "An urn has 4 white and 6 black balls; two are drawn without replacement.",
+        "PROBABILITY",
+    ),
+    ("Find the null space of [[1, 2], [2, 4]]", "LINEAR_ALGEBRA"),
+    ("Diagonalize the matrix [[4, 1], [2, 3]]", "LINEAR_ALGEBRA"),
+    (
+        "Find the rank of the 3x3 matrix with rows (1,2,3), (2,4,6), (1,0,1)",
+        "LINEAR_ALGEBRA",
+    ),
+    ("Project the vector (3, 4) onto (1, 0)", "LINEAR_ALGEBRA"),
+    (
+        "A ladder 10 m long leans against a wall 8 m high. How far is its foot?",
+        "GEOMETRY",
+    ),
+    ("Find the interior angle of a regular hexagon", "GEOMETRY"),
+    ("Find the surface of a sphere with diameter 12", "GEOMETRY"),
+    ("Two chords of a circle intersect; find the missing segment", "GEOMETRY"),
+    ("Find the interquartile range of 2, 4, 4, 5, 7, 9, 10", "STATISTICS"),
+    ("Compute the z-score of 85 if the mean is 70 and sd is 10", "STATISTICS"),
+    ("Find the mode of the data 1, 2, 2, 3, 3, 3, 4", "STATISTICS"),
+    ("Construct a 95% confidence interval for the population mean", "STATISTICS"),
+    ("Find all integers x with 3x ≡ 4 (mod 7)", "NUMBER_THEORY"),
+    ("How many positive divisors does 360 have?", "NUMBER_THEORY"),
+    ("Show that n^3 - n is divisible by 6 for every integer n", "NUMBER_THEORY"),
+    ("Find the last digit of 7^2024", "NUMBER_THEORY"),
+]
+
+
+def load_labeled(path="./memory/solution_history.json"):
+    problems = list(LABELED_PROBLEMS)
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            problems.extend(
+                (entry["parsed_question"], entry["topic"]) for entry in json.load(f)
+            )
+    return problems
+
+
+def parse_llm_topic(category):
+    category = category.strip().upper().replace(".", "")
+    for topic in TOPIC_CLASSIFIER.topics:
+        if topic in category:
+            return topic
+    return "ALGEBRA"
+
+
+def keyword_topic(text):
+    """The keyword topic, or None where the router would look further."""
+    topic, confidence, _ = TOPIC_CLASSIFIER.classify(text)
+    return topic if confidence >= CONFIDENCE_THRESHOLD else None
+
+
+def evaluate(name, classify, problems):
+    correct, answered, timings = 0, 0, []
+    for text, label in problems:
+        started = time.perf_counter()
+        topic = classify(text)
+        timings.append(time.perf_counter() - started)
+        if topic is not None:
+            answered += 1
+            correct += topic == label
+    return {
+        "method": name,
+        "coverage": answered / len(problems),
+        "accuracy": correct / answered if answered else 0.0,
+        "p50_ms": metrics.percentile(timings, 50) * 1000,
+        "p95_ms": metrics.percentile(timings, 95) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fake-llm", type=float, metavar="LATENCY")
+    parser.add_argument("--skip-llm", action="store_true")
+    args = parser.parse_args(argv)
+
+    problems = load_labeled()
+
+    if args.fake_llm is not None:
+        base.set_llm(FakeChatModel(latency=args.fake_llm))
+
+    rows = []
+    try:
+        rows.append(evaluate("keywords", keyword_topic, problems))
+        if not args.skip_llm:
+            rows.append(
+                evaluate(
+                    "llm",
+                    lambda text: parse_llm_topic(
+                        invoke_llm(
+                            ROUTER_PROMPT.format(problem_text=text), agent="router"
+                        )
+                    ),
+                    problems,
+                )
+            )
+    finally:
+        base.set_llm(None)
+
+    print(f"{len(problems)} labeled problems")
+    print(f"{'method':<22}{'coverage':>10}{'accuracy':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for row in rows:
+        print(
+            f"{row['method']:<22}{row['coverage']:>10.2f}{row['accuracy']:>10.2f}"
+            f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+        )
+    return rows
+
+
+if __name__ == "__main__":
+    main()
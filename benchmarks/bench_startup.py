@@ -0,0 +1,101 @@
+"""
+Startup profile: how long the app's imports take and what dominates them.
+
+Runs `python -X importtime` on the modules app.py imports in a fresh
+interpreter (several times, reporting the median wall time), lists the
+slowest top-level imports, and with --warm-up also times each warm-up
+component loading in the foreground. From the repository root:
+
+    python -m benchmarks.bench_startup --runs 5 --top 15
+"""
+
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+# Everything app.py imports before the first UI element renders.
+APP_IMPORTS = [
+    "streamlit",
+    "metrics",
+    "llm_cache",
+    "warmup",
+    "utils",
+    "rag_engine",
+    "answer_cache",
+    "memory_store",
+    "agents.parser",
+    "agents.router",
+    "agents.classifier",
+    "agents.solver",
+    "agents.explainer",
+    "agents.orchestrator",
+    "agents.base",
+]
+
+
+def import_profile(modules):
+    """(wall seconds, [(cumulative_us, self_us, module), ...]) for one cold import."""
+    code = "import " + ", ".join(modules)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = time.perf_counter() - started
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:") :].split("|")
+            entries.append((int(cumulative_us), int(self_us), name.rstrip()))
+        except ValueError:
+            continue  # the header line
+    return wall, entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument(
+        "--warm-up", action="store_true", help="also time each warm-up component"
+    )
+    args = parser.parse_args(argv)
+
+    walls, entries = [], []
+    for _ in range(args.runs):
+        wall, entries = import_profile(APP_IMPORTS)
+        walls.append(wall)
+    print(
+        f"Cold import of app modules: median {statistics.median(walls):.3f}s "
+        f"(min {min(walls):.3f}s over {args.runs} runs, includes interpreter start)"
+    )
+
+    # Top-level imports only: names are indented by nesting depth.
+    top_level = [e for e in entries if not e[2].startswith("  ")]
+    print(f"\nSlowest top-level imports (cumulative ms / self ms):")
+    for cumulative, own, name in sorted(top_level, reverse=True)[: args.top]:
+        print(f"{name.strip():<40}{cumulative / 1000:>10.1f}{own / 1000:>10.1f}")
+
+    report = {"import_seconds": statistics.median(walls), "imports": top_level}
+    if args.warm_up:
+        import warmup
+
+        started = time.perf_counter()
+        warmup.start(background=False)
+        report["warm_up"] = warmup.status()
+        print(f"\nWarm-up in the foreground: {time.perf_counter() - started:.2f}s")
+        for name, info in report["warm_up"].items():
+            detail = f" ({info['error']})" if info["error"] else ""
+            print(f"{name:<16}{info['state']:<10}{info['seconds']:>8.2f}s{detail}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Check the local verifier against answers with a known verdict.
+
+Feeds agents.verification.check_solution code-computed solutions that are
+right, wrong, or must not be judged locally (extra conditions the
+recognizer does not model), and reports each status, the method used and
+its latency. Any case whose status differs from the expected one is marked
+MISMATCH and makes the run exit non-zero, so this doubles as a regression
+check for the local checks. From the repository root:
+
+    python -m benchmarks.bench_verification
+"""
+
+import sys
+import time
+import argparse
+
+from agents.verification import check_solution
+
+# (problem, printed result, expected status: "pass", "fail" or None)
+CASES = [
+    ("Find the derivative of x^3 + 2x", "3*x**2 + 2", "pass"),
+    ("Find the derivative of x^3 + 2x", "3*x**2", "fail"),
+    ("Integrate x*cos(x) dx", "x*sin(x) + cos(x)", "pass"),
+    ("Integrate x*cos(x) dx", "x*sin(x) - cos(x)", "fail"),
+    ("Limit of sin(x)/x as x -> 0", "1", "pass"),
+    ("Solve x^2 - 5x + 6 = 0", "[2, 3]", "pass"),
+    ("Solve x^2 - 5x + 6 = 0", "[2]", "fail"),
+    ("Solve e^x = 5", "[log(5)]", "pass"),
+    # "e" guessed as a second unknown: R() reads it back as E, so it
+    # substitutes cleanly unless solutions are limited to free symbols.
+    ("Solve e^x = 5", "[(e, log(5))]", "fail"),
+    ("Solve e^x = 5", "[{e: log(5)}]", "fail"),
+    ("Probability of exactly 3 heads in 4 tosses", "1/4 ≈ 0.25", "pass"),
+    ("Probability of exactly 3 heads in 4 tosses", "3/8 ≈ 0.375", "fail"),
+    ("How many ways to choose 2 from 5", "10", "pass"),
+    (
+        "Probability of exactly 3 heads in 4 tosses given that the first toss is tails",
+        "1/4 ≈ 0.25",
+        None,
+    ),
+    (
+        "Choose 2 from 5 people if two particular people refuse to serve together",
+        "10",
+        None,
+    ),
+]
+
+
+def computed_solution(result):
+    """A solution in the solver's code-computed format (see solver.computed_result)."""
+    return f"**Result:**\n`{result}`\n\n**Code:**\n```python\nprint({result!r})\n```"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.parse_args(argv)
+
+    mismatches = 0
+    print(f"{'expected':<10}{'status':<10}{'ms':>8}  {'method':<32}problem -> result")
+    for problem, result, expected in CASES:
+        started = time.perf_counter()
+        status, method, details = check_solution(problem, computed_solution(result))
+        elapsed = (time.perf_counter() - started) * 1000
+        flag = ""
+        if status != expected:
+            mismatches += 1
+            flag = f"  MISMATCH: {details}"
+        print(
+            f"{expected!s:<10}{status!s:<10}{elapsed:>8.1f}  {method or '-':<32}"
+            f"{problem} -> {result}{flag}"
+        )
+    print(f"{len(CASES)} cases, {mismatches} mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Local stand-in for Groq's OpenAI-compatible chat completions endpoint.
+
+Answers POST /openai/v1/chat/completions with fake_response() text, either as
+one JSON body or as server-sent events, after `latency` seconds. It can also
+reject a fraction of requests, or everything above a requests-per-minute
+limit, with 429 + Retry-After, so retry and rate-limit handling can be
+exercised offline:
+
+    server = FakeGroqServer(latency=0.1, error_rate=0.1).start()
+    gateway = LLMGateway("fake-key", base_url=server.base_url)
+"""
+
+import json
+import time
+import random
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fake_llm import fake_response
+
+
+class FakeGroqServer:
+    def __init__(
+        self, latency=0.1, error_rate=0.0, rpm_limit=None, retry_after=1, seed=0
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rpm_limit = rpm_limit
+        self.retry_after = retry_after
+        self.stats = {"requests": 0, "rejected": 0, "connections": 0}
+        self._random = random.Random(seed)
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/openai/v1"
+
+    def _admit(self):
+        """False when this request should get a 429."""
+        with self._lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            over_limit = self.rpm_limit and len(self._recent) >= self.rpm_limit
+            if over_limit or self._random.random() < self.error_rate:
+                self.stats["rejected"] += 1
+                return False
+            self._recent.append(now)
+            return True
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse shows
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.stats["connections"] += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                if not fake._admit():
+                    self._send_json(
+                        429,
+                        {"error": {"message": "rate limit exceeded"}},
+                        {"Retry-After": str(fake.retry_after)},
+                    )
+                    return
+
+                time.sleep(fake.latency)
+                prompt = request["messages"][-1]["content"]
+                text = fake_response(prompt)
+                usage = {
+                    "prompt_tokens": len(prompt.split()),
+                    "completion_tokens": len(text.split()),
+                    "total_tokens": len(prompt.split()) + len(text.split()),
+                }
+                if request.get("stream"):
+                    self._stream(text, usage)
+                else:
+                    self._send_json(
+                        200,
+                        {
+                            "choices": [
+                                {"message": {"role": "assistant", "content": text}}
+                            ],
+                            "usage": usage,
+                        },
+                    )
+
+            def _stream(self, text, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def event(payload):
+                    data = f"data: {payload}\n\n".encode("utf-8")
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+                for i, word in enumerate(text.split(" ")):
+                    piece = word if i == 0 else " " + word
+                    event(json.dumps({"choices": [{"delta": {"content": piece}}]}))
+                # Groq reports usage on the final chunk under x_groq.
+                event(
+                    json.dumps({"choices": [{"delta": {}}], "x_groq": {"usage": usage}})
+                )
+                event("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(
+            target=self._server.serve_forever, name="fake-groq", daemon=True
+        ).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
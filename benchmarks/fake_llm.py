@@ -0,0 +1,115 @@
+import time
+import random
+import asyncio
+import zlib
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+TOPICS = [
+    "ALGEBRA",
+    "CALCULUS",
+    "PROBABILITY",
+    "LINEAR_ALGEBRA",
+    "GEOMETRY",
+    "STATISTICS",
+    "NUMBER_THEORY",
+]
+
+SYMPY_CODE = """```python
+from sympy import symbols, integrate, sin
+x = symbols('x')
+result = integrate(x**2 * sin(x), x)
+print(result)
+```"""
+
+BASIC_CODE = """```python
+print(math.comb(10, 3) / 2**10)
+```"""
+
+
+def _problem(prompt):
+    for marker in ("Problem:", "Input:"):
+        if marker in prompt:
+            return prompt.split(marker, 1)[1].strip().splitlines()[0]
+    return prompt[-200:]
+
+
+def fake_response(prompt):
+    """Deterministic reply shaped like what each agent prompt expects."""
+    problem = _problem(prompt)
+    if "Math Parser" in prompt:
+        text = problem.strip('"').strip()
+        return (
+            '{"problem_text": "%s", "topic": "Algebra", "needs_clarification": false}'
+            % text.replace('"', "'")
+        )
+    if "Math Classifier" in prompt:
+        return TOPICS[zlib.crc32(problem.encode()) % len(TOPICS)]
+    if "Symbolic Math Expert" in prompt:
+        return SYMPY_CODE
+    if "Python Math Engineer" in prompt:
+        return BASIC_CODE
+    if "Verify this math solution" in prompt:
+        return "VERIFIED_CORRECT"
+    if "Explain this solution" in prompt:
+        return " ".join(
+            "Step %d: we rewrite the expression and simplify it." % i
+            for i in range(1, 25)
+        )
+    return " ".join(
+        "Step %d: apply the relevant rule to the problem." % i for i in range(1, 15)
+    )
+
+
+class FakeChatModel:
+    """
+    Offline stand-in for ChatGroq with the invoke/stream/ainvoke surface the
+    agents use. Every call sleeps `latency` seconds (plus up to `jitter`) so
+    benchmarks measure orchestration overhead without network noise.
+    """
+
+    model_name = "fake-chat"
+    temperature = 0.2
+
+    def __init__(self, latency=0.2, jitter=0.0, chunk_latency=0.002, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_latency = chunk_latency
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    def _delay(self):
+        self.calls += 1
+        return self.latency + self._random.random() * self.jitter
+
+    def _usage(self, prompt, text):
+        input_tokens = len(prompt.split())
+        output_tokens = len(text.split())
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def invoke(self, prompt, **kwargs):
+        prompt = str(prompt)
+        time.sleep(self._delay())
+        text = fake_response(prompt)
+        return AIMessage(content=text, usage_metadata=self._usage(prompt, text))
+
+    def stream(self, prompt, **kwargs):
+        prompt = str(prompt)
+        time.sleep(self._delay())
+        text = fake_response(prompt)
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.chunk_latency)
+            yield AIMessageChunk(content=word if i == 0 else " " + word)
+        yield AIMessageChunk(content="", usage_metadata=self._usage(prompt, text))
+
+    async def ainvoke(self, prompt, **kwargs):
+        prompt = str(prompt)
+        await asyncio.sleep(self._delay())
+        text = fake_response(prompt)
+        return AIMessage(content=text, usage_metadata=self._usage(prompt, text))
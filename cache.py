@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU map with an optional per-entry time-to-live (seconds)."""
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.evictions += 1
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+            }
+
+
+class PersistentLRUCache:
+    """
+    LRUCache backed by a SQLite key/value table, so entries survive restarts.
+    Values must be JSON-serializable. With path=None it is purely in-memory.
+    The table is bounded too: least recently used rows beyond `maxsize`, and
+    rows older than `ttl`, are deleted.
+    """
+
+    def __init__(self, path=None, table="entries", maxsize=1024, ttl=None):
+        self.path = path
+        self.table = table
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.disk_hits = 0
+        self.disk_evictions = 0
+        self._disk_size = None
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, "
+                "value TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL)"
+            )
+            columns = {
+                row[1] for row in connection.execute(f"PRAGMA table_info({self.table})")
+            }
+            if "last_used" not in columns:
+                # Tables written before the disk layer was bounded.
+                with connection:
+                    connection.execute(
+                        f"ALTER TABLE {self.table} ADD COLUMN last_used REAL"
+                    )
+                    connection.execute(
+                        f"UPDATE {self.table} SET last_used = created_at"
+                    )
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table}_last_used "
+                f"ON {self.table}(last_used)"
+            )
+            self._disk_size = connection.execute(
+                f"SELECT COUNT(*) FROM {self.table}"
+            ).fetchone()[0]
+            self._connection = connection
+        return self._connection
+
+    def _expired(self, created_at, now):
+        return self.ttl is not None and created_at + self.ttl <= now
+
+    def get(self, key, default=None):
+        value = self.memory.get(key)
+        if value is not None or not self.path:
+            return default if value is None else value
+
+        now = time.time()
+        with self._lock:
+            connection = self._db()
+            row = connection.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return default
+            with connection:
+                if self._expired(row[1], now):
+                    connection.execute(
+                        f"DELETE FROM {self.table} WHERE key = ?", (key,)
+                    )
+                    self._disk_size -= 1
+                    return default
+                connection.execute(
+                    f"UPDATE {self.table} SET last_used = ? WHERE key = ?", (now, key)
+                )
+
+        value = json.loads(row[0])
+        self.disk_hits += 1
+        self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if not self.path:
+            return
+
+        now = time.time()
+        with self._lock:
+            connection = self._db()
+            with connection:
+                exists = connection.execute(
+                    f"SELECT 1 FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                connection.execute(
+                    f"INSERT OR REPLACE INTO {self.table} "
+                    "(key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now),
+                )
+                self._disk_size += exists is None
+                self._evict(connection, now)
+
+    def _evict(self, connection, now):
+        if self.ttl is not None:
+            removed = connection.execute(
+                f"DELETE FROM {self.table} WHERE created_at <= ?", (now - self.ttl,)
+            ).rowcount
+            self._disk_size -= removed
+            self.disk_evictions += removed
+        excess = self._disk_size - self.maxsize
+        if excess > 0:
+            connection.execute(
+                f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM "
+                f"{self.table} ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self._disk_size -= excess
+            self.disk_evictions += excess
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if not self.path:
+            return
+        with self._lock:
+            connection = self._db()
+            with connection:
+                removed = connection.execute(
+                    f"DELETE FROM {self.table} WHERE key = ?", (key,)
+                ).rowcount
+                self._disk_size -= removed
+
+    def clear(self):
+        self.memory.clear()
+        if not self.path:
+            return
+        with self._lock:
+            connection = self._db()
+            with connection:
+                connection.execute(f"DELETE FROM {self.table}")
+            self._disk_size = 0
+
+    def stats(self):
+        return {
+            **self.memory.stats(),
+            "disk_hits": self.disk_hits,
+            "disk_evictions": self.disk_evictions,
+        }
@@ -0,0 +1,218 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+from langchain_core.embeddings import Embeddings
+
+import metrics
+
+EMBEDDING_CACHE_PATH = "./cache/embeddings.db"
+EMBEDDING_BATCH_SIZE = int(os.environ.get("MATH_MENTOR_EMBEDDING_BATCH_SIZE", "64"))
+# Worth it only for large (re)indexing runs; 0 or 1 keeps encoding in-process.
+EMBEDDING_PROCESSES = int(os.environ.get("MATH_MENTOR_EMBEDDING_PROCESSES", "0"))
+MULTI_PROCESS_MIN_TEXTS = 2000
+SQL_CHUNK = 500
+# Documents are bounded by the corpus; query texts come from users, so only
+# the most recently used EMBEDDING_CACHE_MAX_QUERIES of them are kept.
+EMBEDDING_CACHE_MAX_QUERIES = int(
+    os.environ.get("MATH_MENTOR_EMBEDDING_CACHE_QUERIES", "10000")
+)
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    SentenceTransformer embeddings with a persistent per-text cache, keyed by
+    model name and text hash in a SQLite blob table. Only cache misses are
+    encoded, in batches of `batch_size`. Query rows are trimmed to
+    `max_queries`, least recently used first.
+    """
+
+    def __init__(
+        self,
+        model_name,
+        path=None,
+        batch_size=EMBEDDING_BATCH_SIZE,
+        processes=EMBEDDING_PROCESSES,
+        max_queries=EMBEDDING_CACHE_MAX_QUERIES,
+    ):
+        self.model_name = model_name
+        self.path = path or EMBEDDING_CACHE_PATH
+        self.batch_size = batch_size
+        self.processes = processes
+        self.max_queries = max_queries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._model = None
+        self._connection = None
+        self._lock = threading.Lock()
+        # Separate from _lock: loading the model takes seconds and must not
+        # block cache reads, but two threads must not load it twice.
+        self._model_lock = threading.Lock()
+
+    def _db(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._connection = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False
+            )
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+                "is_query INTEGER NOT NULL DEFAULT 0, last_used REAL NOT NULL DEFAULT 0, "
+                "PRIMARY KEY (model, text_hash))"
+            )
+            columns = {
+                row[1]
+                for row in self._connection.execute("PRAGMA table_info(embeddings)")
+            }
+            if "is_query" not in columns:
+                # Tables written before query rows were bounded count as documents.
+                with self._connection:
+                    self._connection.execute(
+                        "ALTER TABLE embeddings "
+                        "ADD COLUMN is_query INTEGER NOT NULL DEFAULT 0"
+                    )
+                    self._connection.execute(
+                        "ALTER TABLE embeddings "
+                        "ADD COLUMN last_used REAL NOT NULL DEFAULT 0"
+                    )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embeddings_queries "
+                "ON embeddings(is_query, last_used)"
+            )
+        return self._connection
+
+    def _encoder(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def _load(self, hashes, query=False):
+        import numpy as np
+
+        found = {}
+        with self._lock:
+            connection = self._db()
+            for i in range(0, len(hashes), SQL_CHUNK):
+                chunk = hashes[i : i + SQL_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = connection.execute(
+                    "SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [self.model_name, *chunk],
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if query and found:
+                with connection:
+                    connection.executemany(
+                        "UPDATE embeddings SET last_used = ? "
+                        "WHERE model = ? AND text_hash = ?",
+                        [(time.time(), self.model_name, key) for key in found],
+                    )
+        return found
+
+    def _store(self, items, query=False):
+        now = time.time()
+        with self._lock:
+            connection = self._db()
+            with connection:
+                # A text stored as a document stays one when it is also queried.
+                connection.executemany(
+                    "INSERT INTO embeddings "
+                    "(model, text_hash, vector, is_query, last_used) "
+                    "VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (model, text_hash) DO UPDATE SET "
+                    "vector = excluded.vector, last_used = excluded.last_used, "
+                    "is_query = MIN(is_query, excluded.is_query)",
+                    [
+                        (self.model_name, key, vector.tobytes(), int(query), now)
+                        for key, vector in items
+                    ],
+                )
+                if query:
+                    self._trim_queries(connection)
+
+    def _trim_queries(self, connection):
+        """Drops the least recently used query rows beyond max_queries."""
+        excess = (
+            connection.execute(
+                "SELECT COUNT(*) FROM embeddings WHERE is_query = 1"
+            ).fetchone()[0]
+            - self.max_queries
+        )
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings "
+                "WHERE is_query = 1 ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self.evictions += excess
+
+    def _encode(self, texts):
+        import numpy as np
+
+        model = self._encoder()
+        if self.processes > 1 and len(texts) >= MULTI_PROCESS_MIN_TEXTS:
+            pool = model.start_multi_process_pool(["cpu"] * self.processes)
+            try:
+                vectors = model.encode(texts, batch_size=self.batch_size, pool=pool)
+            finally:
+                model.stop_multi_process_pool(pool)
+        else:
+            vectors = model.encode(texts, batch_size=self.batch_size)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def embed_vectors(self, texts, query=False):
+        """
+        Float32 array of shape (len(texts), dim), encoding only cache misses.
+        `query` marks the texts as user queries, which are kept in bounded rows.
+        """
+        import numpy as np
+
+        hashes = [text_hash(text) for text in texts]
+        vectors = self._load(sorted(set(hashes)), query)
+
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        metrics.record(
+            "embeddings", cached=len(texts) - len(missing), encoded=len(missing)
+        )
+
+        if missing:
+            keys = list(missing)
+            for i in range(0, len(keys), self.batch_size * 16):
+                batch = keys[i : i + self.batch_size * 16]
+                encoded = self._encode([missing[key] for key in batch])
+                self._store(zip(batch, encoded), query)
+                vectors.update(zip(batch, encoded))
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in hashes])
+
+    def embed_documents(self, texts):
+        return self.embed_vectors(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.embed_vectors([text], query=True)[0].tolist()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import contextvars
+
+import metrics
+
+LLM_CACHE_PATH = os.environ.get("MATH_MENTOR_LLM_CACHE_PATH", "./cache/llm_cache.db")
+LLM_CACHE_ENABLED = os.environ.get("MATH_MENTOR_LLM_CACHE", "1") != "0"
+LLM_CACHE_MAX_BYTES = int(os.environ.get("MATH_MENTOR_LLM_CACHE_MB", "256")) << 20
+
+# Per-agent switches. Generated code is cached by agents.code_cache only after
+# it ran successfully, so replaying a broken reply from here would never retry.
+AGENT_ENABLED = {
+    "parser": True,
+    "router": True,
+    "solver": True,
+    "verifier": True,
+    "explainer": True,
+    "code_generation": False,
+}
+for _agent in filter(None, os.environ.get("MATH_MENTOR_LLM_CACHE_SKIP", "").split(",")):
+    AGENT_ENABLED[_agent.strip()] = False
+
+# Set per request (and copied to worker threads by metrics.bind): `bypass`
+# skips cached replies, `scope` tags what gets stored or served so one
+# problem's replies can be dropped together (forget_scope).
+_bypass = contextvars.ContextVar("llm_cache_bypass", default=False)
+_scope = contextvars.ContextVar("llm_cache_scope", default=None)
+
+_connection = None
+_lock = threading.Lock()
+_total_bytes = None
+_stats = {}
+_evictions = 0
+
+
+def set_path(path):
+    """Switches to another cache file (e.g. a benchmark scratch directory)."""
+    global LLM_CACHE_PATH, _connection, _total_bytes
+    with _lock:
+        if _connection is not None:
+            _connection.close()
+        LLM_CACHE_PATH = path
+        _connection = None
+        _total_bytes = None
+        _stats.clear()
+
+
+def set_agent_enabled(agent, enabled):
+    AGENT_ENABLED[agent] = bool(enabled)
+
+
+def is_enabled(agent):
+    return LLM_CACHE_ENABLED and AGENT_ENABLED.get(agent, True)
+
+
+def set_bypass(bypass):
+    """Ignores cached replies in this context; fresh replies are still stored."""
+    return _bypass.set(bool(bypass))
+
+
+def bypassed():
+    return _bypass.get()
+
+
+def set_scope(scope):
+    """Tags replies stored or served in this context (e.g. with a problem hash)."""
+    return _scope.set(scope)
+
+
+def cache_key(model, temperature, prompt):
+    payload = f"{model}\x00{temperature}\x00{prompt}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def llm_key(llm, prompt, response_format=None):
+    """Cache key for `prompt` sent to `llm` (gateway, ChatGroq or a fake model)."""
+    model = getattr(llm, "model", None) or getattr(llm, "model_name", "unknown")
+    prompt = str(prompt)
+    if response_format is not None:
+        # JSON-mode replies differ from free-text ones for the same prompt.
+        prompt += "\x00" + json.dumps(response_format, sort_keys=True)
+    return cache_key(model, getattr(llm, "temperature", None), prompt)
+
+
+def _db():
+    global _connection, _total_bytes
+    if _connection is None:
+        os.makedirs(os.path.dirname(LLM_CACHE_PATH) or ".", exist_ok=True)
+        _connection = sqlite3.connect(
+            LLM_CACHE_PATH, timeout=30, check_same_thread=False
+        )
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, agent TEXT, content TEXT NOT NULL, usage TEXT, "
+            "size INTEGER NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL, "
+            "scope TEXT)"
+        )
+        columns = {
+            row[1] for row in _connection.execute("PRAGMA table_info(responses)")
+        }
+        if "scope" not in columns:
+            # Caches written before replies were tagged per problem.
+            with _connection:
+                _connection.execute("ALTER TABLE responses ADD COLUMN scope TEXT")
+        _connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_used "
+            "ON responses(last_used)"
+        )
+        _connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_scope ON responses(scope)"
+        )
+        row = _connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses")
+        _total_bytes = row.fetchone()[0]
+    return _connection
+
+
+def _count(agent, hit, usage=None):
+    with _lock:
+        counts = _stats.setdefault(agent, {"hits": 0, "misses": 0, "tokens_saved": 0})
+        counts["hits" if hit else "misses"] += 1
+        counts["tokens_saved"] += (usage or {}).get("total_tokens", 0)
+    metrics.record_cache(f"{agent}_llm_cache", hit)
+
+
+def get(key, agent):
+    """
+    Cached (content, usage) for this key, or None. Refreshes its LRU position
+    and moves it into the current scope, so forget_scope() also drops replies
+    first stored for another request.
+    """
+    if not is_enabled(agent) or _bypass.get():
+        return None
+    try:
+        with _lock:
+            connection = _db()
+            row = connection.execute(
+                "SELECT content, usage FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                with connection:
+                    connection.execute(
+                        "UPDATE responses SET last_used = ?, "
+                        "scope = COALESCE(?, scope) WHERE key = ?",
+                        (time.time(), _scope.get(), key),
+                    )
+    except sqlite3.Error as e:
+        print(f"LLM Cache Error: {e}")
+        return None
+
+    if row is None:
+        _count(agent, False)
+        return None
+    usage = json.loads(row[1]) if row[1] else {}
+    _count(agent, True, usage)
+    return row[0], usage
+
+
+def put(key, agent, content, usage=None):
+    global _total_bytes
+    if not is_enabled(agent) or not content:
+        return
+    usage_json = json.dumps(dict(usage or {}))
+    size = len(content.encode("utf-8")) + len(usage_json) + len(key)
+    now = time.time()
+    try:
+        with _lock:
+            connection = _db()
+            with connection:
+                previous = connection.execute(
+                    "SELECT size FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                connection.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(key, agent, content, usage, size, created_at, last_used, scope) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, agent, content, usage_json, size, now, now, _scope.get()),
+                )
+                _total_bytes += size - (previous[0] if previous else 0)
+                _evict(connection)
+    except sqlite3.Error as e:
+        print(f"LLM Cache Error: {e}")
+
+
+def _evict(connection):
+    """Drops least recently used responses until the cache fits LLM_CACHE_MAX_BYTES."""
+    global _total_bytes, _evictions
+    while _total_bytes > LLM_CACHE_MAX_BYTES:
+        rows = connection.execute(
+            "SELECT key, size FROM responses ORDER BY last_used LIMIT 100"
+        ).fetchall()
+        if not rows:
+            _total_bytes = 0
+            return
+        dropped = []
+        for key, size in rows:
+            if _total_bytes <= LLM_CACHE_MAX_BYTES:
+                break
+            dropped.append((key,))
+            _total_bytes -= size
+        connection.executemany("DELETE FROM responses WHERE key = ?", dropped)
+        _evictions += len(dropped)
+
+
+def forget_scope(scope):
+    """Drops every reply tagged with `scope`, e.g. after the user rejected the answer."""
+    global _total_bytes
+    if scope is None:
+        return 0
+    try:
+        with _lock:
+            connection = _db()
+            with connection:
+                size, count = connection.execute(
+                    "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM responses "
+                    "WHERE scope = ?",
+                    (scope,),
+                ).fetchone()
+                connection.execute("DELETE FROM responses WHERE scope = ?", (scope,))
+            _total_bytes -= size
+    except sqlite3.Error as e:
+        print(f"LLM Cache Error: {e}")
+        return 0
+    return count
+
+
+def clear():
+    global _total_bytes
+    with _lock:
+        connection = _db()
+        with connection:
+            connection.execute("DELETE FROM responses")
+        _total_bytes = 0
+        _stats.clear()
+
+
+def cache_stats():
+    """Per-agent hits, misses and hit rate in this process, plus on-disk size."""
+    agents = {}
+    for agent, counts in sorted(_stats.items()):
+        total = counts["hits"] + counts["misses"]
+        agents[agent] = {**counts, "hit_rate": round(counts["hits"] / total, 3)}
+    with _lock:
+        try:
+            entries = _db().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        return {
+            "agents": agents,
+            "entries": entries,
+            "bytes": _total_bytes,
+            "evictions": _evictions,
+        }
@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+MEMORY_DB = "./memory/solution_history.db"
+LEGACY_MEMORY_FILE = "./memory/solution_history.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS solutions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    question_hash TEXT NOT NULL,
+    topic TEXT,
+    feedback TEXT,
+    packet TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_solutions_topic ON solutions(topic);
+CREATE INDEX IF NOT EXISTS idx_solutions_feedback ON solutions(feedback);
+CREATE INDEX IF NOT EXISTS idx_solutions_question ON solutions(question_hash);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+def normalize_question(text):
+    return " ".join(str(text).lower().split())
+
+
+def question_hash(text):
+    return hashlib.sha256(normalize_question(text).encode("utf-8")).hexdigest()
+
+
+def _connect(db_path):
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # FULL makes every committed append durable across a crash or power loss.
+    connection.execute("PRAGMA synchronous=FULL")
+    return connection
+
+
+def get_connection(db_path=None):
+    """One connection per thread and database; Streamlit sessions run on separate threads."""
+    db_path = db_path or MEMORY_DB
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    connection = connections.get(db_path)
+    if connection is None:
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        connection = _connect(db_path)
+        connections[db_path] = connection
+
+        with _init_lock:
+            if db_path not in _initialized:
+                connection.executescript(SCHEMA)
+                if LEGACY_MEMORY_FILE:
+                    migrate_legacy_json(LEGACY_MEMORY_FILE, connection)
+                _initialized.add(db_path)
+
+    return connection
+
+
+def _insert(connection, packet, created_at=None):
+    cursor = connection.execute(
+        "INSERT INTO solutions (created_at, question_hash, topic, feedback, packet) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (
+            created_at or time.time(),
+            question_hash(packet.get("parsed_question", "")),
+            packet.get("topic"),
+            packet.get("user_feedback", "positive"),
+            json.dumps(packet),
+        ),
+    )
+    return cursor.lastrowid
+
+
+def append_entry(packet, db_path=None):
+    connection = get_connection(db_path)
+    with connection:
+        return _insert(connection, packet)
+
+
+def migrate_legacy_json(json_path, connection):
+    """
+    One-shot import of the old monolithic history file. The meta table records
+    the migration so later startups never read the JSON again.
+    """
+    done = connection.execute(
+        "SELECT value FROM meta WHERE key = 'legacy_json_migrated'"
+    ).fetchone()
+    if done or not os.path.exists(json_path):
+        return 0
+
+    try:
+        with open(json_path, "r") as f:
+            history = json.load(f)
+    except Exception as e:
+        print(f"Memory Migration Error: {e}")
+        return 0
+
+    with connection:
+        for entry in history:
+            _insert(connection, entry)
+        connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_json_migrated', ?)",
+            (json.dumps({"source": json_path, "entries": len(history)}),),
+        )
+    print(f"Migrated {len(history)} memory entries from {json_path}")
+    return len(history)
+
+
+def iter_entries(
+    topic=None, feedback=None, after_id=None, batch_size=500, db_path=None
+):
+    """Streams stored packets oldest first without loading the whole history."""
+    clauses, params = [], []
+    if after_id is not None:
+        clauses.append("id > ?")
+        params.append(after_id)
+    if topic is not None:
+        clauses.append("topic = ?")
+        params.append(topic)
+    if feedback is not None:
+        clauses.append("feedback = ?")
+        params.append(feedback)
+
+    query = "SELECT id, packet FROM solutions"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY id"
+
+    cursor = get_connection(db_path).execute(query, params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for row_id, packet in rows:
+            entry = json.loads(packet)
+            entry["memory_id"] = row_id
+            yield entry
+
+
+def find_by_question(text, feedback=None, db_path=None):
+    query = "SELECT id, packet FROM solutions WHERE question_hash = ?"
+    params = [question_hash(text)]
+    if feedback is not None:
+        query += " AND feedback = ?"
+        params.append(feedback)
+    query += " ORDER BY id DESC"
+
+    entries = []
+    for row_id, packet in get_connection(db_path).execute(query, params):
+        entry = json.loads(packet)
+        entry["memory_id"] = row_id
+        entries.append(entry)
+    return entries
+
+
+def set_feedback(memory_id, feedback, db_path=None):
+    """
+    Relabels one entry, e.g. demotes a served answer the user rejected. Rows
+    are otherwise append-only; the feedback counts in store_revision() make
+    the vector index pick the change up.
+    """
+    connection = get_connection(db_path)
+    with connection:
+        row = connection.execute(
+            "SELECT packet FROM solutions WHERE id = ?", (memory_id,)
+        ).fetchone()
+        if row is None:
+            return False
+        packet = json.loads(row[0])
+        packet["user_feedback"] = feedback
+        connection.execute(
+            "UPDATE solutions SET feedback = ?, packet = ? WHERE id = ?",
+            (feedback, json.dumps(packet), memory_id),
+        )
+    return True
+
+
+def store_revision(db_path=None):
+    """
+    Cheap change marker (row count, last ID and positive count) for the
+    vector index manifest.
+    """
+    count, last_id, positive = (
+        get_connection(db_path)
+        .execute(
+            "SELECT COUNT(*), COALESCE(MAX(id), 0), "
+            "COALESCE(SUM(feedback = 'positive'), 0) FROM solutions"
+        )
+        .fetchone()
+    )
+    return [count, last_id, positive]
@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+
+METRICS_LOG = os.environ.get("MATH_MENTOR_METRICS_LOG", "./logs/metrics.jsonl")
+
+_current = contextvars.ContextVar("math_mentor_request", default=None)
+_export_lock = threading.Lock()
+
+
+class RequestMetrics:
+    """Stage events collected for one solve request, safe to append from worker threads."""
+
+    def __init__(self, request_id=None, **attributes):
+        self.request_id = request_id or uuid.uuid4().hex[:12]
+        self.attributes = attributes
+        self.started_at = time.time()
+        self.events = []
+        self._lock = threading.Lock()
+
+    def add(self, stage, **fields):
+        event = {"stage": stage, "at": time.time() - self.started_at, **fields}
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self):
+        """Per-stage totals: wall seconds, call count, tokens and cache hits/misses."""
+        totals = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            stage = totals.setdefault(event["stage"], {})
+            for field, value in event.items():
+                if field in ("stage", "at"):
+                    continue
+                if field == "cache_hit":
+                    key = "cache_hits" if value else "cache_misses"
+                    stage[key] = stage.get(key, 0) + 1
+                elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                    stage[field] = round(stage.get(field, 0) + value, 4)
+        return totals
+
+    def to_record(self):
+        with self._lock:
+            events = list(self.events)
+        return {
+            "request_id": self.request_id,
+            "started_at": self.started_at,
+            **self.attributes,
+            "events": events,
+            "summary": self.summary(),
+        }
+
+
+def current_request():
+    return _current.get()
+
+
+def activate(request_metrics):
+    """Makes request_metrics the target of every record in this context."""
+    return _current.set(request_metrics)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextmanager
+def request(request_id=None, export=True, **attributes):
+    request_metrics = RequestMetrics(request_id, **attributes)
+    token = activate(request_metrics)
+    try:
+        yield request_metrics
+    finally:
+        deactivate(token)
+        if export:
+            export_request(request_metrics)
+
+
+def record(stage, **fields):
+    request_metrics = _current.get()
+    if request_metrics is not None:
+        request_metrics.add(stage, **fields)
+
+
+def record_cache(stage, hit):
+    record(stage, cache_hit=bool(hit))
+
+
+def record_llm_usage(stage, response):
+    """Pulls token counts out of a LangChain chat message, when the provider reports them."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage:
+        record(
+            stage,
+            llm_calls=1,
+            input_tokens=usage.get("input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0),
+        )
+        return
+
+    token_usage = (getattr(response, "response_metadata", None) or {}).get(
+        "token_usage", {}
+    )
+    record(
+        stage,
+        llm_calls=1,
+        input_tokens=token_usage.get("prompt_tokens", 0),
+        output_tokens=token_usage.get("completion_tokens", 0),
+    )
+
+
+@contextmanager
+def stage(name, **fields):
+    """Times the enclosed block; extra fields can be added to the yielded dict."""
+    started = time.perf_counter()
+    extra = dict(fields)
+    try:
+        yield extra
+    except Exception as e:
+        extra["error"] = type(e).__name__
+        raise
+    finally:
+        record(name, seconds=time.perf_counter() - started, calls=1, **extra)
+
+
+def timed(name):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def bind(func):
+    """Wraps func so it records into the caller's request when run on another thread."""
+    context = contextvars.copy_context()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def export_request(request_metrics, path=METRICS_LOG):
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        line = json.dumps(request_metrics.to_record(), default=str)
+        with _export_lock:
+            with open(path, "a") as f:
+                f.write(line + "\n")
+    except OSError as e:
+        print(f"Metrics Export Error: {e}")
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(path=METRICS_LOG):
+    """Aggregates exported requests into per-stage p50/p95/p99 wall times."""
+    per_stage = {}
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for name, totals in json.loads(line).get("summary", {}).items():
+                if "seconds" in totals:
+                    per_stage.setdefault(name, []).append(totals["seconds"])
+
+    return {
+        name: {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+        }
+        for name, values in sorted(per_stage.items())
+    }
+
+
+if __name__ == "__main__":
+    report = summarize(sys.argv[1] if len(sys.argv) > 1 else METRICS_LOG)
+    print(f"{'stage':<22}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, row in report.items():
+        print(
+            f"{name:<22}{row['count']:>7}"
+            f"{row['p50']:>10.3f}{row['p95']:>10.3f}{row['p99']:>10.3f}"
+        )
@@ -0,0 +1,287 @@
+import os
+import io
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+import metrics
+from cache import PersistentLRUCache
+
+# Bump when preprocessing changes, so cached text from the old pipeline is ignored.
+OCR_PIPELINE_VERSION = 1
+OCR_CACHE_PATH = "./cache/ocr_cache.db"
+OCR_CACHE_SIZE = 256
+OCR_WORKERS = int(
+    os.environ.get("MATH_MENTOR_OCR_WORKERS", min(4, os.cpu_count() or 1))
+)
+TESSERACT_CONFIG = "--oem 1 --psm 6"
+
+# Phone photos are scaled down to this longest side before anything else runs,
+# then regions are resized so a typical glyph is about TARGET_GLYPH_HEIGHT
+# pixels tall, which is where Tesseract is most accurate.
+MAX_SIDE = 2000
+TARGET_GLYPH_HEIGHT = 24
+MAX_UPSCALE = 4.0
+MAX_SKEW_DEGREES = 10
+SKEW_STEP_DEGREES = 0.5
+REGION_PADDING = 8
+# Tall blocks are split (at their widest line gap) so big pages OCR in parallel.
+REGION_MAX_LINES = 4
+
+_results = PersistentLRUCache(OCR_CACHE_PATH, table="ocr", maxsize=OCR_CACHE_SIZE)
+_executor = None
+
+
+def _read_bytes(image_file):
+    """Uploaded file, open binary file or path -> raw bytes."""
+    if isinstance(image_file, (str, os.PathLike)):
+        with open(image_file, "rb") as f:
+            return f.read()
+    if hasattr(image_file, "getvalue"):
+        return image_file.getvalue()
+    data = image_file.read()
+    if hasattr(image_file, "seek"):
+        image_file.seek(0)
+    return data
+
+
+def to_grayscale(image):
+    """Flattens transparency onto white first; a plain convert('L') turns it black."""
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, image)
+    return np.asarray(image.convert("L"), dtype=np.uint8)
+
+
+def otsu_threshold(gray):
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = histogram.sum()
+    weight = np.cumsum(histogram)
+    mean = np.cumsum(histogram * np.arange(256))
+    background = weight[:-1]
+    foreground = total - background
+    valid = (background > 0) & (foreground > 0)
+    between = np.zeros(255)
+    between[valid] = (mean[-1] * background[valid] / total - mean[:-1][valid]) ** 2 / (
+        background[valid] * foreground[valid]
+    )
+    return int(np.argmax(between))
+
+
+def binarize(gray):
+    """Boolean ink mask (True = text), assuming the page is lighter than the text."""
+    ink = gray <= otsu_threshold(gray)
+    if ink.mean() > 0.5:
+        ink = ~ink  # light text on a dark background
+    return ink
+
+
+def _resize(gray, scale):
+    if abs(scale - 1.0) < 0.05:
+        return gray
+    height, width = gray.shape
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    resample = Image.LANCZOS if scale < 1 else Image.BICUBIC
+    return np.asarray(Image.fromarray(gray).resize(size, resample), dtype=np.uint8)
+
+
+def _rotate(gray, angle):
+    image = Image.fromarray(gray)
+    return np.asarray(
+        image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255),
+        dtype=np.uint8,
+    )
+
+
+def estimate_skew(ink):
+    """
+    Angle (degrees) that makes text lines horizontal: the rotation whose row
+    profile is sharpest. Searched on a small copy, since only the lines matter.
+    """
+    scale = min(1.0, 600 / max(ink.shape))
+    small = Image.fromarray(ink.astype(np.uint8) * 255)
+    if scale < 1.0:
+        small = small.resize(
+            (max(1, round(ink.shape[1] * scale)), max(1, round(ink.shape[0] * scale)))
+        )
+
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(
+        -MAX_SKEW_DEGREES, MAX_SKEW_DEGREES + 1e-9, SKEW_STEP_DEGREES
+    ):
+        rotated = np.asarray(small.rotate(float(angle), expand=True), dtype=np.float32)
+        score = float(np.var(rotated.sum(axis=1)))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def _runs(mask):
+    """(start, stop) index pairs of consecutive True values."""
+    padded = np.concatenate([[False], mask, [False]])
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def text_lines(ink):
+    """Row bands containing ink, without ruled lines and speckle."""
+    width = ink.shape[1]
+    rows = ink.sum(axis=1)
+    lines = []
+    for start, stop in _runs(rows > 0):
+        band = rows[start:stop]
+        if stop - start < 3 or band.mean() > 0.6 * width:
+            continue  # speckle, or a ruled line (dense in every row, unlike text)
+        lines.append((start, stop))
+    return lines
+
+
+def _split_block(block):
+    if len(block) <= REGION_MAX_LINES:
+        return [block]
+    gaps = [block[i][0] - block[i - 1][1] for i in range(1, len(block))]
+    cut = 1 + int(np.argmax(gaps))
+    return _split_block(block[:cut]) + _split_block(block[cut:])
+
+
+def text_regions(ink, lines):
+    """
+    Groups text lines into blocks split at gaps taller than one line (and
+    into at most REGION_MAX_LINES lines each), and returns their padded
+    (top, bottom, left, right) boxes in reading order.
+    """
+    if not lines:
+        return []
+    line_height = float(np.median([stop - start for start, stop in lines]))
+    blocks = [[lines[0]]]
+    for line in lines[1:]:
+        if line[0] - blocks[-1][-1][1] > line_height:
+            blocks.append([line])
+        else:
+            blocks[-1].append(line)
+    blocks = [part for block in blocks for part in _split_block(block)]
+
+    height, width = ink.shape
+    regions = []
+    for block in blocks:
+        top, bottom = block[0][0], block[-1][1]
+        columns = np.flatnonzero(ink[top:bottom].any(axis=0))
+        regions.append(
+            (
+                max(0, top - REGION_PADDING),
+                min(height, bottom + REGION_PADDING),
+                max(0, int(columns[0]) - REGION_PADDING),
+                min(width, int(columns[-1]) + 1 + REGION_PADDING),
+            )
+        )
+    return regions
+
+
+def glyph_height(ink, lines):
+    """
+    Median height of connected ink blobs (roughly the x-height). Stacked math
+    (fractions, exponents) merges row bands, so band height alone overestimates.
+    """
+    try:
+        from scipy import ndimage
+    except ImportError:
+        return 0.5 * float(np.median([stop - start for start, stop in lines]))
+
+    labels, count = ndimage.label(ink)
+    heights = np.array(
+        [box[0].stop - box[0].start for box in ndimage.find_objects(labels)]
+    )
+    heights = heights[heights >= 3]
+    if not len(heights):
+        return float(TARGET_GLYPH_HEIGHT)
+    return float(np.median(heights))
+
+
+def preprocess(image):
+    """
+    PIL image -> list of binarized region crops (uint8, black text on white),
+    top to bottom, ready for Tesseract.
+    """
+    gray = to_grayscale(image)
+    gray = _resize(gray, min(1.0, MAX_SIDE / max(gray.shape)))
+
+    angle = estimate_skew(binarize(gray))
+    if abs(angle) >= SKEW_STEP_DEGREES:
+        gray = _rotate(gray, angle)
+
+    ink = binarize(gray)
+    lines = text_lines(ink)
+    if not lines:
+        return []
+
+    scale = min(MAX_UPSCALE, TARGET_GLYPH_HEIGHT / glyph_height(ink, lines))
+    if 0.5 < scale < 1.0:
+        scale = 1.0  # only shrink text that is far larger than needed
+    crops = []
+    for top, bottom, left, right in text_regions(ink, lines):
+        region = _resize(gray[top:bottom, left:right], scale)
+        crops.append(np.where(binarize(region), 0, 255).astype(np.uint8))
+    return crops
+
+
+def _tesseract(region):
+    import pytesseract
+
+    return pytesseract.image_to_string(
+        Image.fromarray(region), config=TESSERACT_CONFIG
+    ).strip()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # Each call already runs in its own tesseract process; threads only wait on it.
+        os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+        _executor = ThreadPoolExecutor(
+            max_workers=OCR_WORKERS, thread_name_prefix="ocr"
+        )
+    return _executor
+
+
+def recognize(crops):
+    """OCRs region crops in parallel and joins the text in reading order."""
+    if len(crops) <= 1 or OCR_WORKERS <= 1:
+        texts = [_tesseract(crop) for crop in crops]
+    else:
+        texts = list(_get_executor().map(_tesseract, crops))
+    return "\n".join(text for text in texts if text)
+
+
+def image_key(data):
+    payload = f"{OCR_PIPELINE_VERSION}\x00{TESSERACT_CONFIG}\x00".encode("utf-8")
+    return hashlib.sha256(payload + data).hexdigest()
+
+
+def extract_text(image_file):
+    """
+    Text in an uploaded image. Identical uploads are answered from the
+    content-hash cache; otherwise the image is preprocessed and its text
+    regions are OCR'd side by side.
+    """
+    data = _read_bytes(image_file)
+    key = image_key(data)
+    text = _results.get(key)
+    metrics.record_cache("ocr_cache", text is not None)
+    if text is not None:
+        return text
+
+    with metrics.stage("ocr_preprocess") as stage:
+        crops = preprocess(Image.open(io.BytesIO(data)))
+        stage["regions"] = len(crops)
+    with metrics.stage("ocr_tesseract"):
+        text = recognize(crops)
+
+    _results.set(key, text)
+    return text
+
+
+def cache_stats():
+    return _results.stats()
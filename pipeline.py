@@ -0,0 +1,254 @@
+"""
+Headless solving pipeline for bulk problem sets.
+
+Runs parser, router, solver, verifier and explainer for every problem in a
+JSONL or CSV file without the Streamlit UI, streaming one JSON result per
+line to the output file. Problems already solved in the output are skipped,
+so an interrupted run can simply be started again; those that failed, or
+whose verifier or explainer failed ("partial"), are retried. A retry appends
+a new line for the same id rather than rewriting the file, so the output may
+hold several lines per id: the last line for an id is its current result,
+and earlier ones are superseded. From the repository root:
+
+    python -m pipeline worksheet.csv -o results.jsonl --concurrency 8 --rpm 120
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+import answer_cache
+from agents import base
+from agents.parser import run_parser_agent
+from agents.router import run_router_agent
+from agents.solver import run_solver_agent
+from agents.orchestrator import run_post_solve_agents
+
+PROBLEM_FIELDS = ("problem", "question", "problem_text", "parsed_question", "text")
+DEFAULT_CONCURRENCY = 4
+PROGRESS_EVERY_SECONDS = 10
+
+
+def read_problems(path, field=None):
+    """
+    Yields (problem_id, problem_text) from a .jsonl or .csv file. The id comes
+    from an `id` column when present, otherwise the 1-based row number.
+    """
+    fields = (field,) if field else PROBLEM_FIELDS
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+
+        for row_number, row in enumerate(rows, start=1):
+            text = next((row[name] for name in fields if row.get(name)), None)
+            if text is None:
+                print(f"Skipping row {row_number}: no problem text")
+                continue
+            problem_id = row.get("id")
+            yield str(problem_id if problem_id not in (None, "") else row_number), text
+
+
+def completed_ids(output_path):
+    """
+    IDs already solved successfully in an earlier run of the same output file.
+    Only the last line for each id counts, so a later failure supersedes an
+    earlier success.
+    """
+    statuses = {}
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue  # torn last line from an interrupted run
+            statuses[str(result["id"])] = result.get("status")
+    return {problem_id for problem_id, status in statuses.items() if status == "ok"}
+
+
+def solve_problem(problem, problem_id=None, use_answer_cache=True, post_solve=True):
+    """
+    Runs the full agent pipeline on one problem and returns a JSON-ready
+    result. Failures are reported in the result rather than raised.
+    """
+    result = {"id": problem_id, "problem": problem, "status": "ok"}
+    started = time.perf_counter()
+
+    with metrics.request(source="pipeline", problem_id=problem_id) as request_metrics:
+        try:
+            with metrics.stage("total"):
+                parsed = run_parser_agent(problem)
+                problem_text = parsed.get("problem_text") or problem
+                result["problem_text"] = problem_text
+                result["needs_clarification"] = bool(parsed.get("needs_clarification"))
+
+                cached = answer_cache.lookup(problem_text, bypass=not use_answer_cache)
+                if cached:
+                    result.update(
+                        topic=cached["topic"],
+                        solution=cached["final_answer"],
+                        context=cached["retrieved_context"],
+                        verifier=cached["verifier_outcome"],
+                        answer_cache=cached["match"],
+                    )
+                else:
+                    topic = run_router_agent(problem_text)
+                    solution, context = run_solver_agent(problem_text, topic)
+                    result.update(topic=topic, solution=solution, context=context)
+
+                if post_solve:
+                    agents = ["explainer"] if cached else None
+                    for agent, output, error, _ in run_post_solve_agents(
+                        problem_text, result["solution"], agents=agents
+                    ):
+                        result[agent] = output
+                        if error:
+                            result.setdefault("errors", {})[agent] = error
+                    if result.get("errors"):
+                        result["status"] = "partial"
+        except Exception as e:
+            print(f"Pipeline Error ({problem_id}): {e}")
+            result["status"] = "error"
+            result["error"] = str(e)
+
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    result["metrics"] = request_metrics.summary()
+    return result
+
+
+def run_batch(
+    input_path,
+    output_path,
+    concurrency=DEFAULT_CONCURRENCY,
+    calls_per_minute=None,
+    field=None,
+    limit=None,
+    use_answer_cache=True,
+    post_solve=True,
+):
+    """
+    Solves every problem in input_path that is not already done in output_path,
+    appending results as they finish. Returns a throughput summary.
+    """
+    base.set_rate_limit(calls_per_minute)
+    done = completed_ids(output_path)
+    summary = {
+        "completed": 0,
+        "partial": 0,
+        "failed": 0,
+        "skipped": 0,
+        "llm_calls": 0,
+    }
+
+    if os.path.exists(output_path) and os.path.getsize(output_path):
+        with open(output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            torn = f.read(1) != b"\n"
+    else:
+        torn = False
+
+    started = time.perf_counter()
+    last_progress = started
+
+    def write(out, result):
+        out.write(json.dumps(result, default=str) + "\n")
+        out.flush()
+        status = result["status"]
+        summary[{"ok": "completed", "partial": "partial"}.get(status, "failed")] += 1
+        summary["llm_calls"] += sum(
+            totals.get("llm_calls", 0) for totals in result["metrics"].values()
+        )
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="pipeline"
+    ) as pool:
+        if torn:
+            out.write("\n")
+
+        pending = set()
+        submitted = 0
+        for problem_id, problem in read_problems(input_path, field):
+            if problem_id in done:
+                summary["skipped"] += 1
+                continue
+            if limit is not None and submitted >= limit:
+                break
+
+            # Keep the queue short so huge input files are streamed, not loaded.
+            while len(pending) >= concurrency * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    write(out, future.result())
+
+            pending.add(
+                pool.submit(
+                    solve_problem, problem, problem_id, use_answer_cache, post_solve
+                )
+            )
+            submitted += 1
+
+            now = time.perf_counter()
+            if now - last_progress >= PROGRESS_EVERY_SECONDS:
+                last_progress = now
+                finished_count = (
+                    summary["completed"] + summary["partial"] + summary["failed"]
+                )
+                print(
+                    f"{finished_count} solved, {summary['failed']} failed, "
+                    f"{finished_count / (now - started):.2f} problems/s"
+                )
+
+        for future in pending:
+            write(out, future.result())
+
+    base.set_rate_limit(None)
+    elapsed = time.perf_counter() - started
+    processed = summary["completed"] + summary["partial"] + summary["failed"]
+    summary["seconds"] = round(elapsed, 3)
+    summary["problems_per_second"] = round(processed / elapsed, 3) if elapsed else 0.0
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("input", help="problems as .jsonl or .csv")
+    parser.add_argument("-o", "--output", required=True, help="results .jsonl")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument(
+        "--rpm", type=float, default=None, help="max LLM requests per minute"
+    )
+    parser.add_argument("--field", help="column/key holding the problem text")
+    parser.add_argument("--limit", type=int, help="solve at most this many problems")
+    parser.add_argument("--no-answer-cache", action="store_true")
+    parser.add_argument(
+        "--skip-post-solve",
+        action="store_true",
+        help="stop after the solver (no verifier or explainer)",
+    )
+    args = parser.parse_args(argv)
+
+    summary = run_batch(
+        args.input,
+        args.output,
+        concurrency=args.concurrency,
+        calls_per_minute=args.rpm,
+        field=args.field,
+        limit=args.limit,
+        use_answer_cache=not args.no_answer_cache,
+        post_solve=not args.skip_post_solve,
+    )
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["failed"] == summary["partial"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,241 @@
 import os
+import abc
 import json
+import hashlib
+import threading
+
+import memory_store
+import metrics
 
 DB_DIR = "./chroma_db"
-MEMORY_FILE = "./memory/solution_history.json"
+NUMPY_INDEX_DIR = "./vector_index"
 KB_PATH = "./knowledge_base/math_formulas.txt"
+MANIFEST_NAME = "index_manifest.json"
+
+# "chroma" (default) or "numpy" for the in-process memory-mapped index.
+RETRIEVAL_BACKEND = os.environ.get("MATH_MENTOR_RETRIEVAL_BACKEND", "chroma")
+
+# Bump whenever the way documents are built changes, so existing indexes get resynced.
+INDEX_VERSION = 2
+INDEX_BATCH_SIZE = 500
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Retrieval shaping: candidates fetched per returned document, how much MMR
+# favours relevance over diversity, when two hits count as duplicates, and the
+# context budget handed to the solver prompt (~4 characters per token). A
+# document that does not fit is cut to the budget left, unless that is below
+# RETRIEVAL_MIN_TRUNCATED tokens.
+RETRIEVAL_FETCH_FACTOR = 4
+MMR_LAMBDA = 0.7
+DUPLICATE_SIMILARITY = 0.95
+RETRIEVAL_TOKEN_BUDGET = int(os.environ.get("MATH_MENTOR_RETRIEVAL_TOKENS", "600"))
+RETRIEVAL_MIN_TRUNCATED = 32
+
+# Solved examples are only retrieved for these feedback values, scaled by weight.
+FEEDBACK_WEIGHTS = {"positive": 1.0, "neutral": 0.6}
+
+# Process-wide handles shared by every Streamlit session and agent call.
+_resources = {}
+_resource_lock = threading.RLock()
+_resource_stats = {"hits": 0, "misses": 0}
+# One index sync at a time, so a request arriving mid warm-up waits instead of
+# embedding the same documents again.
+_sync_lock = threading.Lock()
+
+
+def _shared_resource(name, factory):
+    # Reentrant lock: building the vector store asks for the embeddings handle.
+    with _resource_lock:
+        resource = _resources.get(name)
+        hit = resource is not None
+        if hit:
+            _resource_stats["hits"] += 1
+        else:
+            _resource_stats["misses"] += 1
+            with metrics.stage(f"load_{name}"):
+                resource = factory()
+            _resources[name] = resource
+    metrics.record_cache(name, hit)
+    return resource
 
 
 def get_embeddings():
-    from langchain_community.embeddings import SentenceTransformerEmbeddings
+    def build():
+        from embedding_cache import CachedEmbeddings
 
-    return SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
+        return CachedEmbeddings(EMBEDDING_MODEL)
 
+    return _shared_resource("embeddings", build)
 
-def init_vector_store():
-    from langchain_community.vectorstores import Chroma
+
+class RetrievalBackend(abc.ABC):
+    """
+    What the indexer and retrieve_context need from a vector store. `where`
+    filters map a metadata key (source, type, feedback, ...) to one accepted
+    value or a list of them. Scores are cosine similarities, higher is better.
+    """
+
+    name = None
+    directory = None
+
+    @abc.abstractmethod
+    def ids(self):
+        pass
+
+    @abc.abstractmethod
+    def add(self, ids, documents):
+        pass
+
+    @abc.abstractmethod
+    def delete(self, ids):
+        pass
+
+    @abc.abstractmethod
+    def search_batch(self, queries, k, where=None):
+        """Returns one list of (Document, score) per query."""
+
+    def search(self, query, k, where=None):
+        return self.search_batch([query], k, where=where)[0]
+
+
+class ChromaBackend(RetrievalBackend):
+    name = "chroma"
+
+    def __init__(self, directory, embedding_function):
+        from langchain_community.vectorstores import Chroma
+
+        self.directory = directory
+        self.store = Chroma(
+            embedding_function=embedding_function, persist_directory=directory
+        )
+
+    def ids(self):
+        return self.store.get(include=[])["ids"]
+
+    def add(self, ids, documents):
+        self.store.add_documents(documents, ids=ids)
+
+    def delete(self, ids):
+        self.store.delete(ids=ids)
+
+    @staticmethod
+    def _filter(where):
+        if not where:
+            return None
+        clauses = [
+            (
+                {key: {"$in": list(value)}}
+                if isinstance(value, (list, tuple, set))
+                else {key: value}
+            )
+            for key, value in where.items()
+        ]
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def search_batch(self, queries, k, where=None):
+        results = []
+        for query in queries:
+            hits = self.store.similarity_search_with_score(
+                query, k=k, filter=self._filter(where)
+            )
+            # Chroma returns squared L2 distance; for unit vectors cos = 1 - d/2.
+            results.append([(doc, 1.0 - distance / 2.0) for doc, distance in hits])
+        return results
+
+
+class NumpyBackend(RetrievalBackend):
+    name = "numpy"
+
+    def __init__(self, directory, embedding_function):
+        from vector_index import NumpyVectorIndex
+
+        self.directory = directory
+        self.index = NumpyVectorIndex(directory, embedding_function)
+
+    def ids(self):
+        return self.index.ids()
+
+    def add(self, ids, documents):
+        self.index.add(ids, documents)
+
+    def delete(self, ids):
+        self.index.delete(ids)
+
+    def search_batch(self, queries, k, where=None):
+        from langchain_core.documents import Document
+
+        return [
+            [(Document(**stored), score) for stored, score in hits]
+            for hits in self.index.search_batch(queries, k, where=where)
+        ]
+
+
+def get_vector_store(backend=None):
+    backend = backend or RETRIEVAL_BACKEND
+
+    def build():
+        if backend == "numpy":
+            return NumpyBackend(NUMPY_INDEX_DIR, get_embeddings())
+        if backend == "chroma":
+            return ChromaBackend(DB_DIR, get_embeddings())
+        raise ValueError(f"Unknown retrieval backend: {backend}")
+
+    return _shared_resource(f"vector_store:{backend}", build)
+
+
+def resource_cache_stats():
+    with _resource_lock:
+        return {**_resource_stats, "loaded": sorted(_resources)}
+
+
+def _document_id(document):
+    """Stable content-hash ID, so an unchanged chunk always maps to the same entry."""
+    payload = json.dumps(
+        {"content": document.page_content, "metadata": document.metadata},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _file_signature(path):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _source_fingerprint():
+    return {
+        "version": INDEX_VERSION,
+        "kb": _file_signature(KB_PATH),
+        "memory": memory_store.store_revision(),
+    }
+
+
+def _load_manifest(directory):
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(directory, manifest):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def _load_source_documents():
     from langchain_text_splitters import CharacterTextSplitter
     from langchain_core.documents import Document
 
-    embedding_function = get_embeddings()
     documents = []
 
     if os.path.exists(KB_PATH):
@@ -32,65 +250,183 @@ def init_vector_store():
                     )
                 )
 
-    if os.path.exists(MEMORY_FILE):
-        try:
-            with open(MEMORY_FILE, "r") as f:
-                history = json.load(f)
-                for entry in history:
-                    content = (
-                        f"SIMILAR SOLVED PROBLEM:\n"
-                        f"Q: {entry['parsed_question']}\n"
-                        f"Topic: {entry['topic']}\n"
-                        f"Verified Solution: {entry['final_answer']}\n"
-                        f"Verifier Note: {entry['verifier_outcome']}"
-                    )
+    try:
+        for entry in memory_store.iter_entries():
+            outcome = entry.get("verifier_outcome")
+            if isinstance(outcome, dict):
+                # Just the verdict: method, details and timings are not context.
+                outcome = outcome.get("verdict")
+            content = (
+                f"SIMILAR SOLVED PROBLEM:\n"
+                f"Q: {entry['parsed_question']}\n"
+                f"Topic: {entry['topic']}\n"
+                f"Verified Solution: {entry['final_answer']}\n"
+                f"Verifier Note: {outcome}"
+            )
 
-                    documents.append(
-                        Document(
-                            page_content=content,
-                            metadata={
-                                "source": "memory",
-                                "type": "solved_example",
-                                "feedback": entry.get("user_feedback", "positive"),
-                            },
-                        )
-                    )
-        except Exception as e:
-            print(f"Memory Load Error: {e}")
+            documents.append(
+                Document(
+                    page_content=content,
+                    metadata={
+                        "source": "memory",
+                        "type": "solved_example",
+                        "topic": entry.get("topic") or "UNKNOWN",
+                        "feedback": entry.get("user_feedback", "positive"),
+                    },
+                )
+            )
+    except Exception as e:
+        print(f"Memory Load Error: {e}")
+
+    return documents
 
-    if documents:
-        return Chroma.from_documents(
-            documents, embedding_function, persist_directory=DB_DIR
-        )
-    else:
-        return Chroma(embedding_function=embedding_function, persist_directory=DB_DIR)
 
+def init_vector_store():
+    """
+    Brings the persisted index in line with the knowledge base and memory file.
+    Only new or changed documents are embedded, vanished ones are deleted, and
+    the manifest lets us skip the whole pass when neither source has changed.
+    """
+    with _sync_lock, metrics.stage("index_sync") as sync:
+        return _sync_vector_store(sync)
 
-def retrieve_context(query, k=3):
-    from langchain_community.vectorstores import Chroma
 
-    embedding_function = get_embeddings()
-    db = Chroma(persist_directory=DB_DIR, embedding_function=embedding_function)
+def _sync_vector_store(sync):
+    db = get_vector_store()
 
-    docs = db.similarity_search(query, k=k + 2)
-    return [d.page_content for d in docs]
+    fingerprint = _source_fingerprint()
+    if _load_manifest(db.directory).get("fingerprint") == fingerprint:
+        sync["skipped"] = 1
+        return db
 
+    wanted = {}
+    for document in _load_source_documents():
+        wanted[_document_id(document)] = document
 
-def save_full_memory_trace(data_packet):
+    existing = set(db.ids())
+    stale = [doc_id for doc_id in existing if doc_id not in wanted]
+    fresh = [doc_id for doc_id in wanted if doc_id not in existing]
+
+    for i in range(0, len(stale), INDEX_BATCH_SIZE):
+        db.delete(stale[i : i + INDEX_BATCH_SIZE])
+
+    for i in range(0, len(fresh), INDEX_BATCH_SIZE):
+        batch = fresh[i : i + INDEX_BATCH_SIZE]
+        db.add(batch, [wanted[doc_id] for doc_id in batch])
+
+    _save_manifest(
+        db.directory, {"fingerprint": fingerprint, "document_count": len(wanted)}
+    )
+    print(f"Vector store synced: +{len(fresh)} / -{len(stale)} documents")
+    sync.update(added=len(fresh), deleted=len(stale))
+    return db
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def truncate_to_tokens(text, budget):
+    """Cuts text to about `budget` estimated tokens, at a word boundary when possible."""
+    limit = max(0, (budget - 1) * 4)
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > limit // 2 else cut).rstrip() + " …"
+
+
+def _candidates(db, query, fetch_k, topic):
+    """Textbook rules plus feedback-weighted solved examples, as (Document, score)."""
+    candidates = db.search(query, k=fetch_k, where={"type": "rule"})
+
+    where = {"type": "solved_example", "feedback": list(FEEDBACK_WEIGHTS)}
+    examples = (
+        db.search(query, k=fetch_k, where={**where, "topic": topic}) if topic else []
+    )
+    if not examples:
+        # Unknown or mislabelled topic: fall back to examples from every topic.
+        examples = db.search(query, k=fetch_k, where=where)
+
+    for doc, score in examples:
+        weight = FEEDBACK_WEIGHTS.get(doc.metadata.get("feedback"), 0.0)
+        candidates.append((doc, score * weight))
+    return candidates
+
+
+def _select_context(candidates, k, token_budget):
     """
-    Saves the complete lifecycle of the problem as required by the assignment.
+    Drops near-duplicates, then picks up to k documents by maximal marginal
+    relevance while the running token estimate stays within token_budget;
+    the first one that does not fit is truncated to the budget left.
     """
-    os.makedirs(os.path.dirname(MEMORY_FILE), exist_ok=True)
+    import numpy as np
+
+    unique, seen = [], set()
+    for doc, score in sorted(candidates, key=lambda hit: -hit[1]):
+        key = " ".join(doc.page_content.lower().split())
+        if key not in seen:
+            seen.add(key)
+            unique.append((doc, score))
+    if not unique:
+        return [], {"candidates": 0, "duplicates": 0, "tokens": 0}
+
+    # Documents were embedded at index time, so these come from the embedding cache.
+    vectors = np.asarray(
+        get_embeddings().embed_documents([doc.page_content for doc, _ in unique]),
+        dtype=np.float32,
+    )
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    similarity = vectors @ vectors.T
+    relevance = np.array([score for _, score in unique], dtype=np.float32)
+
+    selected, texts, tokens = [], [], 0
+    duplicates = len(candidates) - len(unique)
+    redundancy = np.zeros(len(unique), dtype=np.float32)
+    remaining = np.ones(len(unique), dtype=bool)
+    while len(selected) < k and remaining.any():
+        mmr = MMR_LAMBDA * relevance - (1 - MMR_LAMBDA) * redundancy
+        mmr[~remaining] = -np.inf
+        best = int(np.argmax(mmr))
+        remaining[best] = False
 
-    history = []
-    if os.path.exists(MEMORY_FILE):
-        with open(MEMORY_FILE, "r") as f:
-            try:
-                history = json.load(f)
-            except:
-                history = []
+        text = unique[best][0].page_content
+        if tokens + estimate_tokens(text) > token_budget:
+            if token_budget - tokens < RETRIEVAL_MIN_TRUNCATED:
+                continue
+            text = truncate_to_tokens(text, token_budget - tokens)
+        selected.append(best)
+        texts.append(text)
+        tokens += estimate_tokens(text)
 
-    history.append(data_packet)
+        redundancy = np.maximum(redundancy, similarity[best])
+        near_duplicates = remaining & (redundancy >= DUPLICATE_SIMILARITY)
+        duplicates += int(near_duplicates.sum())
+        remaining &= ~near_duplicates
 
-    with open(MEMORY_FILE, "w") as f:
-        json.dump(history, f, indent=2)
+    stats = {"candidates": len(candidates), "duplicates": duplicates, "tokens": tokens}
+    return texts, stats
+
+
+@metrics.timed("retrieval")
+def retrieve_context(query, k=3, topic=None, token_budget=None):
+    """
+    Context for the solver prompt: up to k textbook rules and well-rated solved
+    examples (same topic when one is given), deduplicated, diversified with MMR
+    and packed into token_budget estimated tokens.
+    """
+    db = get_vector_store()
+    if token_budget is None:
+        token_budget = RETRIEVAL_TOKEN_BUDGET
+
+    candidates = _candidates(db, query, k * RETRIEVAL_FETCH_FACTOR, topic)
+    context, stats = _select_context(candidates, k, token_budget)
+    metrics.record("retrieval_context", documents=len(context), **stats)
+    return context
+
+
+def save_full_memory_trace(data_packet):
+    """
+    Saves the complete lifecycle of the problem as required by the assignment.
+    """
+    return memory_store.append_entry(data_packet)
@@ -0,0 +1,231 @@
+import os
+import queue
+import atexit
+import hashlib
+import threading
+import subprocess
+
+import numpy as np
+
+import metrics
+from cache import PersistentLRUCache
+
+# "openai" runs openai-whisper; "faster" runs faster-whisper with int8 weights,
+# which is several times quicker on CPU. Smaller models ("tiny", "base.en")
+# trade some accuracy for latency with either backend.
+WHISPER_BACKEND = os.environ.get("MATH_MENTOR_WHISPER_BACKEND", "openai")
+WHISPER_MODEL = os.environ.get("MATH_MENTOR_WHISPER_MODEL", "base")
+WHISPER_COMPUTE_TYPE = os.environ.get("MATH_MENTOR_WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_THREADS = int(
+    os.environ.get("MATH_MENTOR_WHISPER_THREADS", os.cpu_count() or 1)
+)
+
+SAMPLE_RATE = 16000
+# Whisper's own window; each chunk's text is streamed back as soon as it is done.
+CHUNK_SECONDS = 30
+# Chunks end at the quietest 100ms in their last few seconds, so words are not cut.
+SPLIT_SEARCH_SECONDS = 5
+QUEUE_SIZE = int(os.environ.get("MATH_MENTOR_TRANSCRIPTION_QUEUE", "8"))
+QUEUE_TIMEOUT_SECONDS = 5
+
+TRANSCRIPT_CACHE_PATH = "./cache/transcripts.db"
+TRANSCRIPT_CACHE_SIZE = 256
+
+_DONE = object()
+
+
+class TranscriptionBusy(RuntimeError):
+    pass
+
+
+def decode_audio(data, sample_rate=SAMPLE_RATE):
+    """Decodes any ffmpeg-readable bytes to mono float32 PCM in memory (no temp file)."""
+    command = [
+        "ffmpeg",
+        "-nostdin",
+        "-loglevel",
+        "error",
+        "-i",
+        "pipe:0",
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        str(sample_rate),
+        "pipe:1",
+    ]
+    result = subprocess.run(command, input=data, capture_output=True, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to decode audio: {result.stderr.decode().strip()}")
+    return np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+def split_audio(samples, sample_rate=SAMPLE_RATE):
+    """Splits samples into chunks of at most CHUNK_SECONDS, cutting at quiet spots."""
+    chunk = CHUNK_SECONDS * sample_rate
+    frame = sample_rate // 10
+    start = 0
+    while len(samples) - start > chunk:
+        window_start = start + chunk - SPLIT_SEARCH_SECONDS * sample_rate
+        window = samples[window_start : start + chunk]
+        frames = window[: len(window) // frame * frame].reshape(-1, frame)
+        quietest = int(np.argmin(np.square(frames).mean(axis=1)))
+        end = window_start + quietest * frame + frame // 2
+        yield samples[start:end]
+        start = end
+    if start < len(samples):
+        yield samples[start:]
+
+
+def audio_key(data):
+    payload = f"{WHISPER_BACKEND}\x00{WHISPER_MODEL}\x00".encode("utf-8")
+    return hashlib.sha256(payload + data).hexdigest()
+
+
+class TranscriptionJob:
+    """Iterating yields each chunk's text as the worker finishes it."""
+
+    def __init__(self, data, key):
+        self.data = data
+        self.key = key
+        self._chunks = queue.Queue()
+        self._parts = []
+
+    def __iter__(self):
+        while True:
+            item = self._chunks.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            separator = " " if self._parts else ""
+            self._parts.append(item)
+            yield separator + item
+
+    @property
+    def text(self):
+        return " ".join(self._parts).strip()
+
+
+class TranscriptionService:
+    """
+    One Whisper model shared by every session, fed by a bounded queue and a
+    single worker thread (the model is not safe to call concurrently). Audio is
+    decoded in memory and transcribed chunk by chunk; finished transcripts are
+    cached by a hash of the audio bytes and the model settings.
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self._jobs = queue.Queue(maxsize=queue_size)
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._transcripts = PersistentLRUCache(
+            TRANSCRIPT_CACHE_PATH, table="transcripts", maxsize=TRANSCRIPT_CACHE_SIZE
+        )
+        self._worker = threading.Thread(
+            target=self._run, name="transcription", daemon=True
+        )
+        self._worker.start()
+
+    # --- model -------------------------------------------------------------
+
+    def load_model(self):
+        with self._model_lock:
+            if self._model is None:
+                if WHISPER_BACKEND == "faster":
+                    from faster_whisper import WhisperModel
+
+                    self._model = WhisperModel(
+                        WHISPER_MODEL,
+                        device="cpu",
+                        compute_type=WHISPER_COMPUTE_TYPE,
+                        cpu_threads=WHISPER_THREADS,
+                    )
+                else:
+                    import torch
+                    import whisper
+
+                    torch.set_num_threads(WHISPER_THREADS)
+                    self._model = whisper.load_model(WHISPER_MODEL, device="cpu")
+            return self._model
+
+    def _transcribe_chunk(self, samples, previous_text):
+        model = self.load_model()
+        # The tail of the previous chunk keeps spelling and context consistent.
+        prompt = previous_text[-200:] or None
+        if WHISPER_BACKEND == "faster":
+            segments, _ = model.transcribe(samples, beam_size=1, initial_prompt=prompt)
+            return "".join(segment.text for segment in segments).strip()
+        result = model.transcribe(samples, fp16=False, initial_prompt=prompt)
+        return result["text"].strip()
+
+    # --- queue -------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            try:
+                text = ""
+                for samples in split_audio(decode_audio(job.data)):
+                    piece = self._transcribe_chunk(samples, text)
+                    if piece:
+                        text = f"{text} {piece}".strip()
+                        job._chunks.put(piece)
+                self._transcripts.set(job.key, text)
+                job._chunks.put(_DONE)
+            except Exception as e:
+                job._chunks.put(e)
+            finally:
+                job.data = None
+
+    def submit(self, data):
+        """
+        Queues audio bytes and returns an iterable of partial transcripts.
+        Cached audio returns its transcript at once; a full queue raises
+        TranscriptionBusy instead of piling up work.
+        """
+        key = audio_key(data)
+        job = TranscriptionJob(data, key)
+        cached = self._transcripts.get(key)
+        metrics.record_cache("transcription_cache", cached is not None)
+        if cached is not None:
+            job._chunks.put(cached)
+            job._chunks.put(_DONE)
+            return job
+        try:
+            self._jobs.put(job, timeout=QUEUE_TIMEOUT_SECONDS)
+        except queue.Full:
+            raise TranscriptionBusy(
+                "Transcription queue is full, please try again shortly."
+            ) from None
+        return job
+
+    def transcribe(self, data):
+        job = self.submit(data)
+        for _ in job:
+            pass
+        return job.text
+
+    def shutdown(self):
+        try:
+            self._jobs.put_nowait(None)
+        except queue.Full:
+            pass
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_transcription_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = TranscriptionService()
+            atexit.register(_service.shutdown)
+        return _service
@@ -1,28 +1,38 @@
-import streamlit as st
-from PIL import Image
-import pytesseract
+import metrics
 
 
-@st.cache_resource
-def load_whisper_model():
-
-    import whisper 
-    return whisper.load_model("base")
+def _audio_bytes(audio_file):
+    """Uploaded file, path or raw bytes -> bytes, without touching the disk."""
+    if isinstance(audio_file, (bytes, bytearray)):
+        return bytes(audio_file)
+    if isinstance(audio_file, str):
+        with open(audio_file, "rb") as f:
+            return f.read()
+    return audio_file.getvalue()
 
+@metrics.timed("ocr")
 def process_image(image_file):
     try:
-        image = Image.open(image_file)
-        gray_image = image.convert('L')
-        text = pytesseract.image_to_string(gray_image)
+        # numpy/PIL load with the OCR stage, not at app start.
+        import ocr
+
+        text = ocr.extract_text(image_file)
         return text.strip(), None
     except Exception as e:
         return "", str(e)
 
-def process_audio(audio_file_path):
-    try:
+def stream_audio(audio_file):
+    """Iterable of partial transcripts from the shared Whisper service; `.text` has the total."""
+    from transcription import get_transcription_service
 
-        model = load_whisper_model()
-        result = model.transcribe(audio_file_path)
-        return result["text"].strip(), None
+    return get_transcription_service().submit(_audio_bytes(audio_file))
+
+@metrics.timed("transcription")
+def process_audio(audio_file):
+    try:
+        job = stream_audio(audio_file)
+        for _ in job:
+            pass
+        return job.text, None
     except Exception as e:
-        return "", str(e)
\ No newline at end of file
+        return "", str(e)
@@ -0,0 +1,163 @@
+import os
+import json
+import threading
+
+import numpy as np
+
+VECTORS_FILE = "vectors.f32"
+DOCUMENTS_FILE = "documents.json"
+
+
+class NumpyVectorIndex:
+    """
+    Exact cosine-similarity index kept as a memory-mapped float32 matrix of
+    normalized vectors, plus a JSON sidecar with IDs, text and metadata.
+    Appends write to the end of the matrix file; deletes rewrite it. The
+    sidecar is replaced atomically after each write and is the source of
+    truth: rows past its length (an append interrupted before the sidecar
+    was saved) are cut off before the matrix is opened or appended to.
+    """
+
+    def __init__(self, directory, embedding_function):
+        self.directory = directory
+        self.embedding_function = embedding_function
+        self._lock = threading.Lock()
+        self._ids = []
+        self._documents = []
+        self._matrix = None
+        self._columns = {}
+        self._load()
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.directory, VECTORS_FILE)
+
+    @property
+    def _documents_path(self):
+        return os.path.join(self.directory, DOCUMENTS_FILE)
+
+    def _load(self):
+        if not os.path.exists(self._documents_path):
+            return
+        with open(self._documents_path, "r") as f:
+            stored = json.load(f)
+        self._ids = stored["ids"]
+        self._documents = stored["documents"]
+        self._truncate_vectors(stored["dim"])
+        self._open_matrix(stored["dim"])
+
+    def _truncate_vectors(self, dim):
+        expected = len(self._ids) * dim * np.dtype(np.float32).itemsize
+        if os.path.exists(self._vectors_path):
+            if os.path.getsize(self._vectors_path) > expected:
+                os.truncate(self._vectors_path, expected)
+
+    def _open_matrix(self, dim):
+        if not self._ids:
+            self._matrix = None
+        else:
+            self._matrix = np.memmap(
+                self._vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(len(self._ids), dim),
+            )
+        self._columns = {}
+
+    def _save_documents(self, dim):
+        tmp_path = self._documents_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dim": dim, "ids": self._ids, "documents": self._documents}, f)
+        os.replace(tmp_path, self._documents_path)
+
+    def _embed(self, texts):
+        vectors = np.asarray(
+            self.embedding_function.embed_documents(texts), dtype=np.float32
+        )
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        return vectors
+
+    def ids(self):
+        return list(self._ids)
+
+    def add(self, ids, documents):
+        vectors = self._embed([d.page_content for d in documents])
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            self._truncate_vectors(vectors.shape[1])
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            self._ids.extend(ids)
+            self._documents.extend(
+                {"page_content": d.page_content, "metadata": d.metadata}
+                for d in documents
+            )
+            self._save_documents(vectors.shape[1])
+            self._open_matrix(vectors.shape[1])
+
+    def delete(self, ids):
+        drop = set(ids)
+        with self._lock:
+            if self._matrix is None:
+                return
+            keep = [i for i, doc_id in enumerate(self._ids) if doc_id not in drop]
+            dim = self._matrix.shape[1]
+            kept = np.array(self._matrix[keep], dtype=np.float32)
+            self._matrix = None
+
+            tmp_path = self._vectors_path + ".tmp"
+            kept.tofile(tmp_path)
+            os.replace(tmp_path, self._vectors_path)
+
+            self._ids = [self._ids[i] for i in keep]
+            self._documents = [self._documents[i] for i in keep]
+            self._save_documents(dim)
+            self._open_matrix(dim)
+
+    def _column(self, key):
+        column = self._columns.get(key)
+        if column is None:
+            column = np.array(
+                [d["metadata"].get(key) for d in self._documents], dtype=object
+            )
+            self._columns[key] = column
+        return column
+
+    def _mask(self, where):
+        """where maps a metadata key to one value or a list of accepted values."""
+        mask = np.ones(len(self._ids), dtype=bool)
+        for key, accepted in (where or {}).items():
+            column = self._column(key)
+            if isinstance(accepted, (list, tuple, set)):
+                mask &= np.isin(column, list(accepted))
+            else:
+                mask &= column == accepted
+        return mask
+
+    def search_vectors(self, queries, k, where=None):
+        """
+        Top-k for a (m, dim) batch of normalized query vectors.
+        Returns, per query, a list of (document dict, cosine score).
+        """
+        with self._lock:
+            matrix, documents = self._matrix, self._documents
+            mask = self._mask(where) if matrix is not None else None
+        if matrix is None or k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        scores = np.asarray(queries, dtype=np.float32) @ matrix.T
+        if where:
+            scores[:, ~mask] = -np.inf
+        k = min(k, scores.shape[1])
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(scores, top):
+            ranked = candidates[np.argsort(-row[candidates])]
+            results.append(
+                [(documents[i], float(row[i])) for i in ranked if np.isfinite(row[i])]
+            )
+        return results
+
+    def search_batch(self, texts, k, where=None):
+        return self.search_vectors(self._embed(list(texts)), k, where=where)
@@ -0,0 +1,114 @@
+import os
+import time
+import threading
+
+# Comma-separated components to preload at startup; empty or "0" disables it.
+WARMUP_COMPONENTS = os.environ.get(
+    "MATH_MENTOR_WARMUP", "embeddings,vector_store,sympy,whisper"
+)
+
+
+def _embeddings():
+    from rag_engine import get_embeddings
+
+    get_embeddings().embed_query("warm up")
+
+
+def _vector_store():
+    from rag_engine import init_vector_store
+
+    init_vector_store()
+
+
+def _sympy():
+    from agents.sandbox import get_sandbox_pool
+
+    # Starts the forkserver (which imports SymPy) and every worker behind it.
+    _, error = get_sandbox_pool().run("print(symbols('x'))", use_sympy=True)
+    if error:
+        raise RuntimeError(error)
+
+
+def _whisper():
+    from transcription import get_transcription_service
+
+    get_transcription_service().load_model()
+
+
+LOADERS = {
+    "embeddings": _embeddings,
+    "vector_store": _vector_store,
+    "sympy": _sympy,
+    "whisper": _whisper,
+}
+
+_status = {}
+_ready = {name: threading.Event() for name in LOADERS}
+_lock = threading.Lock()
+
+
+def _load(name):
+    started = time.perf_counter()
+    try:
+        LOADERS[name]()
+        state, error = "ready", None
+    except Exception as e:
+        print(f"Warm-up Error ({name}): {e}")
+        state, error = "failed", str(e)
+    with _lock:
+        _status[name] = {
+            "state": state,
+            "seconds": round(time.perf_counter() - started, 3),
+            "error": error,
+        }
+    _ready[name].set()
+
+
+def start(components=None, background=True):
+    """
+    Preloads each component once per process, each on its own daemon thread
+    so a slow one (Whisper) does not hold up the others. Returns the threads
+    started, or [] when run in the foreground or everything already started.
+    """
+    if components is None:
+        components = [c.strip() for c in WARMUP_COMPONENTS.split(",")]
+        components = [c for c in components if c and c != "0"]
+
+    pending = []
+    with _lock:
+        for name in components:
+            if name in LOADERS and name not in _status:
+                _status[name] = {"state": "loading", "seconds": None, "error": None}
+                pending.append(name)
+
+    if not background:
+        for name in pending:
+            _load(name)
+        return []
+
+    threads = []
+    for name in pending:
+        thread = threading.Thread(
+            target=_load, args=(name,), name=f"warm-up-{name}", daemon=True
+        )
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+def is_ready(name):
+    with _lock:
+        return _status.get(name, {}).get("state") == "ready"
+
+
+def wait_until_ready(name, timeout=None):
+    """True once `name` has loaded; False on timeout, failure or if never started."""
+    with _lock:
+        started = name in _status
+    return started and _ready[name].wait(timeout) and is_ready(name)
+
+
+def status():
+    """Readiness flags per component: loading / ready / failed, with load seconds."""
+    with _lock:
+        return {name: dict(info) for name, info in _status.items()}